@@ -38,7 +38,6 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    #'empo_news.apps.AswGrup11AConfig',
     'rest_framework',
     'rest_framework_api_key',
     'corsheaders',
@@ -50,7 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.humanize',
     'social_django',
-    'empo_news',
+    'empo_news.apps.AswGrup11AConfig',
 ]
 
 MIDDLEWARE = [
@@ -69,6 +68,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'asw_grup11a.urls'
 API_KEY_CUSTOM_HEADER = "HTTP_API_KEY"
+API_KEY_CACHE_SIZE = int(os.environ.get('API_KEY_CACHE_SIZE', 1024))
+API_KEY_CACHE_TTL = int(os.environ.get('API_KEY_CACHE_TTL', 300))
 CORS_ORIGIN_ALLOW_ALL = True
 
 CORS_ALLOW_HEADERS = [
@@ -117,6 +118,30 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'asw_grup11a.wsgi.application'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'empo-news'),
+    }
+}
+
+# Story ids cached per feed; votes do not reorder the ranked feeds until their ids expire
+FEED_CACHE_SIZE = int(os.environ.get('FEED_CACHE_SIZE', 600))
+FEED_CACHE_TIMEOUT = int(os.environ.get('FEED_CACHE_TIMEOUT', 60))
+
+# Seconds an anonymous HTML page may be served from the cache, 0 turns the page cache off
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 30))
+
+# Seconds a rendered story or comment row is reused, which also bounds how stale its relative age can get
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 60))
+
+# Queue votes and let manage.py flush_votes apply their counter updates in bulk
+VOTE_WRITE_BEHIND = os.environ.get('VOTE_WRITE_BEHIND', '') == 'True'
+VOTE_FLUSH_INTERVAL = float(os.environ.get('VOTE_FLUSH_INTERVAL', 0.25))
+
+# Seconds between the rank score refreshes of manage.py update_ranks --loop, which let unvoted stories decay
+RANK_UPDATE_INTERVAL = float(os.environ.get('RANK_UPDATE_INTERVAL', 300))
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
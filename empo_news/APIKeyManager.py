@@ -1,9 +1,16 @@
 import base64
 import binascii
 import hashlib
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
 
 
 class APIKeyManager:
+    PREFIX_LENGTH = 12
+    ITERATIONS = 100000
+
     @staticmethod
     def get_hash_key(key):
         key_bytes = key.encode("utf-8")
@@ -12,4 +19,33 @@ class APIKeyManager:
         salt = salt[:salt_half_length]
         hash_bytes = hashlib.pbkdf2_hmac("sha256", key_bytes, salt, 100000)
         hash_key = binascii.hexlify(hash_bytes)
-        return hash_key
\ No newline at end of file
+        return hash_key
+
+    @staticmethod
+    def get_prefix(secret):
+        digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), secret.encode("utf-8"), hashlib.sha256).hexdigest()
+        return digest[:APIKeyManager.PREFIX_LENGTH]
+
+    @staticmethod
+    def get_key(secret):
+        return APIKeyManager.get_prefix(secret) + "." + secret
+
+    @staticmethod
+    def split_key(key):
+        if "." in key:
+            prefix, secret = key.split(".", 1)
+        else:
+            secret = key
+            prefix = APIKeyManager.get_prefix(secret)
+        return prefix, secret
+
+    @staticmethod
+    def make_hash_key(secret):
+        hasher = PBKDF2PasswordHasher()
+        return hasher.encode(secret, hasher.salt(), APIKeyManager.ITERATIONS)
+
+    @staticmethod
+    def verify_hash_key(secret, hash_key):
+        if not hash_key or not hash_key.startswith(PBKDF2PasswordHasher.algorithm + "$"):
+            return False
+        return PBKDF2PasswordHasher().verify(secret, hash_key)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class AswGrup11AConfig(AppConfig):
     name = 'empo_news'
+
+    def ready(self):
+        # Connects the receivers that keep the search index, the domain counters and the verified key cache in step
+        # with writes made outside a request as well
+        from empo_news import search, domains, key_cache  # noqa: F401
@@ -0,0 +1,23 @@
+from rest_framework.authentication import BaseAuthentication
+
+from empo_news.errors import UnauthenticatedException
+from empo_news.key_cache import get_user_fields_id
+from empo_news.models import UserFields
+
+
+class KeyAuthentication(BaseAuthentication):
+    def authenticate(self, request):
+        key = request.META.get('HTTP_API_KEY', '')
+
+        if not key:
+            return None
+
+        try:
+            user_fields = UserFields.objects.select_related('user').get(id=get_user_fields_id(key))
+        except UserFields.DoesNotExist:
+            raise UnauthenticatedException
+
+        return user_fields.user, user_fields
+
+    def authenticate_header(self, request):
+        return 'Api-Key'
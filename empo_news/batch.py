@@ -0,0 +1,133 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction, IntegrityError
+from django.db.models import Q
+
+from empo_news.errors import NotFoundException, ConflictException, ContributionUserException, \
+    InvalidBatchOperationException
+from empo_news.models import Contribution, Comment
+from empo_news.versions import touch_items
+from empo_news.votes import Like, apply_vote_batch, get_delta_expression
+
+Hide = Contribution.user_id_hidden.through
+
+BATCH_ACTIONS = ('vote', 'unvote', 'hide', 'unhide')
+MAX_BATCH_SIZE = 100
+
+
+def get_result(exception=None):
+    if exception is None:
+        return {'status': 204, 'message': 'OK'}
+    return {'status': exception.status_code, 'error': exception.get_codes(), 'message': exception.detail}
+
+
+def parse_operation(operation):
+    if not isinstance(operation, dict) or operation.get('action') not in BATCH_ACTIONS:
+        return None
+
+    try:
+        return operation['action'], int(operation.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_user_ids(through_model, user_id, contribution_ids):
+    return set(through_model.objects.filter(user_id=user_id, contribution_id__in=contribution_ids)
+               .values_list('contribution_id', flat=True))
+
+
+def check_operation(action, contribution_id, user_id, contributions, liked, hidden):
+    if contribution_id not in contributions:
+        raise NotFoundException
+
+    if action == 'vote' and contribution_id in liked:
+        raise ConflictException
+
+    if action == 'unvote':
+        if contributions[contribution_id][0] == user_id:
+            raise ContributionUserException
+        if contribution_id not in liked:
+            raise ConflictException
+
+    if action == 'hide' and contribution_id in hidden:
+        raise ConflictException
+
+    if action == 'unhide' and contribution_id not in hidden:
+        raise ConflictException
+
+
+def apply_hides(user, added_ids, removed_ids, shown):
+    if added_ids:
+        Hide.objects.bulk_create([Hide(contribution_id=contribution_id, user_id=user.id)
+                                  for contribution_id in added_ids])
+
+    if removed_ids:
+        deleted = Hide.objects.filter(user_id=user.id, contribution_id__in=removed_ids).delete()[0]
+        if deleted != len(removed_ids):
+            raise IntegrityError('Hides changed while the batch was being applied')
+
+    deltas = dict([(contribution_id, 1) for contribution_id in added_ids] +
+                  [(contribution_id, -1) for contribution_id in removed_ids])
+    if deltas:
+        Contribution.objects.filter(id__in=deltas).update(hidden=get_delta_expression('hidden', 'id', deltas))
+        touch_items(list(deltas))
+
+    for show in (False, True):
+        paths = [path for path, path_show in shown.items() if path_show == show]
+        if paths:
+            Comment.objects.filter(reduce(or_, [Q(path__startswith=path) for path in paths])).update(show=show)
+
+
+def run_batch(user, operations):
+    parsed = [parse_operation(operation) for operation in operations]
+    ids = {operation[1] for operation in parsed if operation is not None}
+    contributions = {contribution_id: (user_id, path) for contribution_id, user_id, path in
+                     Contribution.objects.filter(id__in=ids).values_list('id', 'user_id', 'comment__path')}
+    liked = get_user_ids(Like, user.id, ids)
+    hidden = get_user_ids(Hide, user.id, ids)
+    initially_liked = set(liked)
+    initially_hidden = set(hidden)
+    shown = {}
+    results = []
+
+    # Operations are checked in order against the in-memory state, then applied together
+    for operation, parsed_operation in zip(operations, parsed):
+        if parsed_operation is None:
+            results.append(dict(get_result(InvalidBatchOperationException()), operation=operation))
+            continue
+
+        action, contribution_id = parsed_operation
+        result = {'action': action, 'id': contribution_id}
+
+        try:
+            check_operation(action, contribution_id, user.id, contributions, liked, hidden)
+        except (NotFoundException, ConflictException, ContributionUserException) as exception:
+            results.append(dict(result, **get_result(exception)))
+            continue
+
+        if action == 'vote':
+            liked.add(contribution_id)
+        elif action == 'unvote':
+            liked.remove(contribution_id)
+        elif action == 'hide':
+            hidden.add(contribution_id)
+        else:
+            hidden.remove(contribution_id)
+
+        path = contributions[contribution_id][1]
+        if path and action in ('hide', 'unhide'):
+            shown[path] = action == 'unhide'
+
+        results.append(dict(result, **get_result()))
+
+    authors = {contribution_id: contribution[0] for contribution_id, contribution in contributions.items()}
+
+    try:
+        with transaction.atomic():
+            apply_vote_batch(user, authors, liked - initially_liked, initially_liked - liked)
+            apply_hides(user, hidden - initially_hidden, initially_hidden - hidden, shown)
+    except IntegrityError:
+        raise ConflictException
+
+    return results
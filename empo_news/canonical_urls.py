@@ -0,0 +1,70 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from django.db import IntegrityError, transaction
+
+from empo_news.models import Contribution
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMETERS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref_src'}
+
+
+def add_scheme(url):
+    url = url.strip()
+    if '://' not in url:
+        return 'http://' + url
+    return url
+
+
+def get_domain(url):
+    host = (urlsplit(add_scheme(url)).hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        return host[4:]
+    return host
+
+
+def is_tracking_parameter(name):
+    name = name.lower()
+    return name.startswith('utm_') or name in TRACKING_PARAMETERS
+
+
+def canonicalize_url(url):
+    parts = urlsplit(add_scheme(url))
+    scheme = parts.scheme.lower()
+    host = get_domain(url)
+    if ':' in host:
+        host = '[' + host + ']'
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host += ':%d' % port
+
+    # The same page served over http and https is the same story
+    if scheme == 'https':
+        scheme = 'http'
+
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not is_tracking_parameter(name)))
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), query, ''))
+
+
+def get_url_hash(url):
+    return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+
+def save_story(contribution):
+    existing = Contribution.objects.filter(url_hash=contribution.url_hash).first()
+    if existing is not None:
+        return existing
+
+    # Two submissions of the same link can both miss the lookup above; the unique index lets only one insert win
+    try:
+        with transaction.atomic():
+            contribution.save()
+    except IntegrityError:
+        return Contribution.objects.get(url_hash=contribution.url_hash)
+
+    return contribution
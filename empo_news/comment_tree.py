@@ -0,0 +1,54 @@
+from empo_news.models import Comment
+from empo_news.votes import merge_pending_points
+
+
+def get_viewer_ids(through_model, root_id, user_id):
+    if user_id is None:
+        return set()
+    return set(through_model.objects.filter(user_id=user_id, contribution__comment__contribution_id=root_id)
+               .values_list('contribution_id', flat=True))
+
+
+def get_shown_parent_id(comment, comments_by_id, top_id, username):
+    # Replies under comments that the username filter leaves out hang from their closest shown ancestor instead
+    parent_id = comment.parent_id
+    while parent_id in comments_by_id and parent_id != top_id and comments_by_id[parent_id].user.username != username:
+        parent_id = comments_by_id[parent_id].parent_id
+    return parent_id
+
+
+def build_comment_tree(contribution, user_id, order_by=('-publication_time', '-id'), username=None):
+    root_id = contribution.contribution_id if isinstance(contribution, Comment) else contribution.id
+    comments = Comment.objects.filter(contribution_id=root_id)
+    if root_id != contribution.id:
+        comments = comments.filter(path__startswith=contribution.path)
+    comments = merge_pending_points(list(comments.select_related('user').order_by(*order_by)))
+    liked_ids = get_viewer_ids(Comment.user_likes.through, root_id, user_id)
+    hidden_ids = get_viewer_ids(Comment.user_id_hidden.through, root_id, user_id)
+    comments_by_id = {}
+
+    for comment in comments:
+        comment.viewer_liked = comment.id in liked_ids
+        comment.viewer_hidden = comment.id in hidden_ids
+        comment.replies = []
+        comments_by_id[comment.id] = comment
+
+    roots = []
+
+    for comment in comments:
+        parent_id = comment.parent_id
+
+        if username:
+            if comment.user.username != username:
+                continue
+            parent_id = get_shown_parent_id(comment, comments_by_id, contribution.id, username)
+
+        if parent_id is None:
+            roots.append(comment)
+        elif parent_id in comments_by_id:
+            comments_by_id[parent_id].replies.append(comment)
+
+    if root_id != contribution.id:
+        return comments_by_id[contribution.id].replies if contribution.id in comments_by_id else []
+
+    return roots
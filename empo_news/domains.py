@@ -0,0 +1,30 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from empo_news.models import Contribution, DomainCounter
+
+
+def count_domain_story(domain, delta):
+    if not domain:
+        return
+
+    if not DomainCounter.objects.filter(domain=domain).update(stories=F('stories') + delta):
+        DomainCounter.objects.get_or_create(domain=domain)
+        DomainCounter.objects.filter(domain=domain).update(stories=F('stories') + delta)
+
+
+def get_domain_stories(domain):
+    return DomainCounter.objects.filter(domain=domain).values_list('stories', flat=True).first() or 0
+
+
+# Comments never carry a domain, so only stories saved or deleted as Contribution move the counters
+@receiver(post_save, sender=Contribution)
+def count_created_story(sender, instance, created, **kwargs):
+    if created:
+        count_domain_story(instance.url_domain, 1)
+
+
+@receiver(post_delete, sender=Contribution)
+def count_deleted_story(sender, instance, **kwargs):
+    count_domain_story(instance.url_domain, -1)
@@ -73,3 +73,40 @@ class ContributionUserException(APIException):
     status_code = 409
     default_detail = 'The contribution is yours'
     default_code = 'Conflict'
+
+
+class InvalidPaginationParametersException(APIException):
+    status_code = 400
+    default_detail = 'The limit parameter must be a positive integer and the cursor must come from a previous response'
+    default_code = 'Bad Request'
+
+
+class InvalidIdsParameterException(APIException):
+    status_code = 400
+    default_detail = 'The ids parameter must be a comma separated list of at most 100 ids'
+    default_code = 'Bad Request'
+
+
+class InvalidFieldsParameterException(APIException):
+    status_code = 400
+    default_detail = 'The fields parameter must be a comma separated list of attributes of the returned items'
+    default_code = 'Bad Request'
+
+
+class InvalidBatchOperationException(APIException):
+    status_code = 400
+    default_detail = 'Send an operations list of at most 100 items, each with an action (vote, unvote, hide or ' \
+                     'unhide) and a contribution id'
+    default_code = 'Bad Request'
+
+
+class InvalidSearchQueryException(APIException):
+    status_code = 400
+    default_detail = 'The q parameter must contain at least one word to search for'
+    default_code = 'Bad Request'
+
+
+class InvalidUrlException(APIException):
+    status_code = 400
+    default_detail = 'Url is not valid'
+    default_code = 'Bad Request'
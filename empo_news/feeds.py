@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from empo_news.models import Contribution
+from empo_news.pagination import PAGE_SIZE, decode_cursor, encode_cursor, get_cursor_values, get_keyset_page
+from empo_news.versions import bump_feed_version, get_feed_ids_version
+from empo_news.votes import merge_pending_points
+
+FEED_SIZE = getattr(settings, 'FEED_CACHE_SIZE', 600)
+FEED_TIMEOUT = getattr(settings, 'FEED_CACHE_TIMEOUT', 60)
+
+FEED_ORDER_FIELDS = {
+    'main_page': 'rank_score',
+    'new_page': 'publication_time',
+    'ask_list': 'points',
+    'show_list': 'points',
+}
+
+
+def get_feed_queryset(name):
+    contributions = Contribution.objects.filter(comment__isnull=True)
+    if name == 'ask_list':
+        contributions = contributions.filter(url__isnull=True)
+    elif name == 'show_list':
+        contributions = contributions.filter(title__startswith='Show EN: ')
+    return contributions
+
+
+# The ids are cached per process unless a shared cache backend is configured, so the key carries a version kept in the
+# database that every worker sees change when a story is submitted, deleted or re-ranked
+def get_feed_key(name):
+    return 'empo_news:feed:' + name + ':' + get_feed_ids_version()
+
+
+def get_feed_ids(name):
+    key = get_feed_key(name)
+    ids = cache.get(key)
+
+    if ids is None:
+        field = FEED_ORDER_FIELDS[name]
+        ids = list(get_feed_queryset(name).order_by('-' + field, '-id').values_list('id', flat=True)[:FEED_SIZE])
+        cache.set(key, ids, FEED_TIMEOUT)
+
+    return ids
+
+
+# Votes do not retire the feed ids, which would keep them from ever being reused under vote load. Their order may lag by
+# up to FEED_TIMEOUT, update_ranks and rollup_votes refresh them, and points are always read fresh per page.
+def invalidate_feeds():
+    bump_feed_version(ids=True)
+
+
+def get_start(visible_ids, cursor, offset):
+    if not cursor:
+        return offset
+
+    try:
+        last_id = decode_cursor(cursor)[1]
+    except ValueError:
+        return offset
+
+    if last_id not in visible_ids:
+        return None
+
+    return visible_ids.index(last_id) + 1
+
+
+def get_feed_page(name, user_id, cursor=None, offset=0, size=PAGE_SIZE):
+    field = FEED_ORDER_FIELDS[name]
+    contributions = get_feed_queryset(name).visible_to(user_id).with_viewer_state(user_id).select_related('user')
+    ids = get_feed_ids(name)
+    visible_ids = ids
+
+    if user_id is not None:
+        hidden_ids = set(Contribution.user_id_hidden.through.objects.filter(user_id=user_id, contribution_id__in=ids)
+                         .values_list('contribution_id', flat=True))
+        visible_ids = [contribution_id for contribution_id in ids if contribution_id not in hidden_ids]
+
+    start = get_start(visible_ids, cursor, offset)
+
+    # Pages that reach past the cached ids are read straight from the database
+    if start is None or (len(ids) >= FEED_SIZE and start + size + 1 > len(visible_ids)):
+        rows, next_cursor = get_keyset_page(contributions, field, cursor=cursor, offset=offset, size=size)
+        return merge_pending_points(rows), next_cursor
+
+    page_ids = visible_ids[start:start + size + 1]
+    contributions_by_id = contributions.in_bulk(page_ids)
+    rows = [contributions_by_id[contribution_id] for contribution_id in page_ids
+            if contribution_id in contributions_by_id]
+    next_cursor = None
+
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(get_cursor_values(rows[-1], field))
+
+    return merge_pending_points(rows), next_cursor
@@ -1,3 +1,5 @@
+from urllib.parse import urlsplit
+
 from django import forms
 
 
@@ -28,6 +30,11 @@ class SubmitForm(forms.Form):
 
     @staticmethod
     def valid_url(url):
+        try:
+            urlsplit(url)
+        except ValueError:
+            return False
+
         url_split = url.split('/')
         result = True
         if len(url_split) > 1:
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60)
+
+STORY_FRAGMENTS = ('title', 'byline', 'discuss')
+COMMENT_FRAGMENTS = ('byline', 'text')
+
+
+def get_fragment_key(kind, name, item):
+    # Points are part of the key because write-behind votes change them before the version is bumped
+    return 'empo_news:fragment:%s:%s:%d:%d:%d' % (kind, name, item.id, item.version, item.points)
+
+
+def attach_fragments(items, kind, names):
+    keys = {(item.id, name): get_fragment_key(kind, name, item) for item in items for name in names}
+    fragments = cache.get_many(list(keys.values()))
+    rendered = {}
+
+    for item in items:
+        item.fragments = {}
+
+        for name in names:
+            key = keys[item.id, name]
+            if key not in fragments:
+                fragments[key] = rendered[key] = render_to_string('empo_news/fragments/%s_%s.html' % (kind, name),
+                                                                  {kind: item})
+            item.fragments[name] = mark_safe(fragments[key])
+
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+
+    return items
+
+
+def attach_story_fragments(contributions):
+    return attach_fragments(list(contributions), 'contribution', STORY_FRAGMENTS)
+
+
+def get_comment_tree_items(comments):
+    items = []
+    for comment in comments:
+        items.append(comment)
+        items.extend(get_comment_tree_items(comment.replies))
+    return items
+
+
+def attach_comment_fragments(comments):
+    return attach_fragments(get_comment_tree_items(comments), 'comment', COMMENT_FRAGMENTS)
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from empo_news.APIKeyManager import APIKeyManager
+from empo_news.models import UserFields
+
+
+class VerifiedKeyCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_digest(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        digest = self.get_digest(key)
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+
+            user_fields_id, expires = entry
+            if expires < time.monotonic():
+                del self._entries[digest]
+                return None
+
+            self._entries.move_to_end(digest)
+            return user_fields_id
+
+    def set(self, key, user_fields_id):
+        digest = self.get_digest(key)
+
+        with self._lock:
+            self._entries[digest] = (user_fields_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_fields_id):
+        with self._lock:
+            digests = [digest for digest, entry in self._entries.items() if entry[0] == user_fields_id]
+            for digest in digests:
+                del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+key_cache = VerifiedKeyCache(getattr(settings, 'API_KEY_CACHE_SIZE', 1024),
+                             getattr(settings, 'API_KEY_CACHE_TTL', 300))
+
+
+def get_user_fields_id(key):
+    if not key:
+        return None
+
+    user_fields_id = key_cache.get(key)
+
+    if user_fields_id is None:
+        user_fields_id = lookup_user_fields_id(key)
+
+        if user_fields_id is not None:
+            key_cache.set(key, user_fields_id)
+
+    return user_fields_id
+
+
+legacy_keys_remaining = True
+
+
+def has_legacy_keys():
+    global legacy_keys_remaining
+
+    # New keys are always stored with a prefix, so once the last legacy key is upgraded the check is never repeated
+    if legacy_keys_remaining:
+        legacy_keys_remaining = UserFields.objects.filter(api_key_prefix__isnull=True, api_key__isnull=False).exists()
+    return legacy_keys_remaining
+
+
+def lookup_user_fields_id(key):
+    prefix, secret = APIKeyManager.split_key(key)
+
+    for user_fields_id, hash_key in UserFields.objects.filter(api_key_prefix=prefix).values_list('id', 'api_key'):
+        if APIKeyManager.verify_hash_key(secret, hash_key):
+            return user_fields_id
+
+    # Keys stored before prefixes existed are found by their derived-salt hash and upgraded on first use. They were
+    # handed out without a "prefix." part, so keys in the new shape never pay for the second hash.
+    if "." in key or not has_legacy_keys():
+        return None
+
+    legacy_hash_key = APIKeyManager.get_hash_key(secret)
+    user_fields_id = UserFields.objects.filter(api_key_prefix__isnull=True, api_key=legacy_hash_key) \
+        .values_list('id', flat=True).first()
+
+    if user_fields_id is not None:
+        UserFields.objects.filter(id=user_fields_id).update(api_key_prefix=APIKeyManager.get_prefix(secret),
+                                                            api_key=APIKeyManager.make_hash_key(secret))
+
+    return user_fields_id
+
+
+@receiver(post_save, sender=UserFields)
+@receiver(post_delete, sender=UserFields)
+def invalidate_user_fields(sender, instance, **kwargs):
+    key_cache.invalidate(instance.id)
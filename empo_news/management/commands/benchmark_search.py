@@ -0,0 +1,66 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from empo_news.models import Contribution
+from empo_news.search import search, rebuild_search_index
+
+VOCABULARY_SIZE = 20000
+INSERT_BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Times search queries over synthetic posts, inside a transaction that is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=300000, help='Number of synthetic posts to search')
+        parser.add_argument('--queries', type=int, default=200, help='Number of timed queries')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['posts'], options['queries'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, posts, queries):
+        generator = random.Random(0)
+        words = ['w%x' % generator.getrandbits(40) for _ in range(VOCABULARY_SIZE)]
+        # Word frequencies follow a Zipf curve so common terms match far more posts than rare ones
+        cum_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+        user = User.objects.create(username='search-benchmark-%d' % generator.getrandbits(32))
+        now = timezone.now()
+
+        start = time.perf_counter()
+        for offset in range(0, posts, INSERT_BATCH_SIZE):
+            Contribution.objects.bulk_create([
+                Contribution(user=user, publication_time=now,
+                             title=' '.join(generator.choices(words, cum_weights=cum_weights, k=6)),
+                             text=' '.join(generator.choices(words, cum_weights=cum_weights, k=30)))
+                for _ in range(min(INSERT_BATCH_SIZE, posts - offset))])
+        rebuild_search_index()
+        self.stdout.write('Inserted and indexed %d posts in %.1fs' % (posts, time.perf_counter() - start))
+
+        for name, terms in [('common', words[:20]), ('rare', words[-5000:]), ('two terms', words[:500])]:
+            timings = []
+            for _ in range(queries):
+                query = ' '.join(generator.sample(terms, 2 if name == 'two terms' else 1))
+                start = time.perf_counter()
+                rows, next_cursor = search(Contribution.objects.all(), query)
+                if next_cursor:
+                    search(Contribution.objects.all(), query, next_cursor)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            timings.sort()
+            self.stdout.write('%s: median %.1f ms, p95 %.1f ms for the first two pages' %
+                              (name, timings[len(timings) // 2], timings[int(len(timings) * 0.95)]))
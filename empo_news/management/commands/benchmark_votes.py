@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from empo_news.models import Contribution
+from empo_news.votes import add_vote, flush_pending_votes
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.updates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        self.updates += sql.startswith('UPDATE')
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Times votes on one story through the synchronous and the write-behind paths, inside a transaction that ' \
+           'is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=1000, help='Number of votes cast through each path')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['votes'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, votes):
+        generator = random.Random(0)
+        prefix = 'vote-benchmark-%d-' % generator.getrandbits(32)
+        User.objects.bulk_create([User(username=prefix + str(number)) for number in range(2 * votes + 1)])
+        voters = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+        author = voters.pop()
+
+        for label, write_behind, path_voters in [('synchronous', False, voters[:votes]),
+                                                 ('write-behind', True, voters[votes:2 * votes])]:
+            story = Contribution.objects.create(user=author, title=label, publication_time=timezone.now(), text='')
+
+            with override_settings(VOTE_WRITE_BEHIND=write_behind):
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    start = time.perf_counter()
+                    for voter in path_voters:
+                        add_vote(story, voter)
+                    elapsed = time.perf_counter() - start
+
+                self.stdout.write('%s: %.0f votes/s, %.1f queries and %.1f UPDATEs per vote' %
+                                  (label, len(path_voters) / elapsed, counter.queries / len(path_voters),
+                                   counter.updates / len(path_voters)))
+
+                if write_behind:
+                    counter = QueryCounter()
+                    with connection.execute_wrapper(counter):
+                        start = time.perf_counter()
+                        flushed = flush_pending_votes()
+                        elapsed = time.perf_counter() - start
+                    self.stdout.write('flush: %d votes in %.2fs with %d queries' % (flushed, elapsed, counter.queries))
+
+            story.refresh_from_db()
+            if story.points != 1 + len(path_voters):
+                self.stderr.write('%s: expected %d points, found %d' % (label, 1 + len(path_voters), story.points))
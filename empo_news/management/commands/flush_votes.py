@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from empo_news.votes import flush_pending_votes
+
+
+class Command(BaseCommand):
+    help = 'Applies queued write-behind votes to contribution points and user karma'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every VOTE_FLUSH_INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        # Without write-behind nothing is queued, so a looping process only drains what an earlier run left behind
+        if options['loop'] and not getattr(settings, 'VOTE_WRITE_BEHIND', False):
+            flushed = flush_pending_votes()
+            self.stdout.write('VOTE_WRITE_BEHIND is off, flushed %d leftover votes and stopped' % flushed)
+            return
+
+        while True:
+            flushed = flush_pending_votes()
+
+            if not options['loop']:
+                self.stdout.write('Flushed %d votes' % flushed)
+                return
+
+            time.sleep(getattr(settings, 'VOTE_FLUSH_INTERVAL', 0.25))
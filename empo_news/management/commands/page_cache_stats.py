@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from empo_news.page_cache import get_page_cache_stats, reset_page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows the hit and miss counters of the anonymous page cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Set both counters back to zero afterwards')
+
+    def handle(self, *args, **options):
+        hits, misses = get_page_cache_stats()
+        total = hits + misses
+        ratio = 100.0 * hits / total if total else 0.0
+        self.stdout.write('Hits: %d, misses: %d, hit ratio: %.1f%%' % (hits, misses, ratio))
+
+        if options['reset']:
+            reset_page_cache_stats()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from empo_news.search import rebuild_search_index, uses_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the SQLite full-text index from the contributions table'
+
+    def handle(self, *args, **options):
+        if uses_search_vector():
+            self.stdout.write('PostgreSQL keeps the search vector up to date by itself')
+            return
+
+        rebuild_search_index()
+        self.stdout.write('Search index rebuilt')
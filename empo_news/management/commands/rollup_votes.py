@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from empo_news.feeds import invalidate_feeds
+from empo_news.models import Contribution, UserFields, VoteEvent, VoteRollupCheckpoint, PendingVote
+from empo_news.votes import refresh_rank_scores
+
+# Events younger than this may still belong to uncommitted transactions holding lower ids
+SETTLE_SECONDS = 5
+
+
+def get_total(events, field):
+    return Coalesce(Subquery(events.values(field).annotate(total=Sum('value')).values('total')), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Refreshes contribution points and user karma from the vote event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every contribution and user')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            checkpoint = VoteRollupCheckpoint.objects.select_for_update().get_or_create(id=1)[0]
+            first_id = 0 if options['full'] else checkpoint.last_event_id
+            settled = VoteEvent.objects.filter(created__lt=timezone.now() - timedelta(seconds=SETTLE_SECONDS))
+            last_id = settled.filter(id__gt=first_id).order_by('-id').values_list('id', flat=True).first()
+
+            if last_id is None:
+                self.stdout.write('No new vote events')
+                return
+
+            events = VoteEvent.objects.filter(id__gt=first_id, id__lte=last_id)
+            contributions = Contribution.objects.all()
+            users = UserFields.objects.all()
+
+            if not options['full']:
+                contributions = contributions.filter(id__in=events.values('contribution_id'))
+                users = users.filter(user_id__in=events.values('contribution__user_id'))
+
+            # Votes still queued by the write-behind buffer are added by flush_votes, not here
+            points = contributions.update(
+                points=get_total(VoteEvent.objects.filter(contribution_id=OuterRef('pk')), 'contribution_id')
+                - get_total(PendingVote.objects.filter(contribution_id=OuterRef('pk')), 'contribution_id') + 1,
+                version=F('version') + 1)
+            karma = users.update(
+                karma=get_total(VoteEvent.objects.filter(contribution__user_id=OuterRef('user_id')),
+                                'contribution__user_id')
+                - get_total(PendingVote.objects.filter(author_id=OuterRef('user_id')), 'author_id') + 1)
+
+            # The front page orders by rank_score, which would otherwise keep the old points until update_ranks runs
+            refresh_rank_scores(contributions)
+
+            checkpoint.last_event_id = last_id
+            checkpoint.save()
+
+        invalidate_feeds()
+        self.stdout.write('Rolled up events up to %d: %d contributions, %d users' % (last_id, points, karma))
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from empo_news.feeds import invalidate_feeds
+from empo_news.models import Contribution
+from empo_news.votes import refresh_rank_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the time-decayed rank score of every story'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--loop', action='store_true', help='Keep updating every RANK_UPDATE_INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            updated = refresh_rank_scores(Contribution.objects.filter(comment__isnull=True), options['batch_size'])
+            invalidate_feeds()
+            self.stdout.write('Updated %d stories' % updated)
+
+            if not options['loop']:
+                return
+
+            time.sleep(getattr(settings, 'RANK_UPDATE_INTERVAL', 300))
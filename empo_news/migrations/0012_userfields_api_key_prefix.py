@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0011_contribution_url_domain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userfields',
+            name='api_key_prefix',
+            field=models.CharField(db_index=True, max_length=12, null=True),
+        ),
+    ]
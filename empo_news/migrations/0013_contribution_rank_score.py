@@ -0,0 +1,30 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:47
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def compute_rank_scores(apps, schema_editor):
+    Contribution = apps.get_model('empo_news', 'Contribution')
+    now = timezone.now()
+
+    for contribution in Contribution.objects.filter(comment__isnull=True).only('id', 'points', 'publication_time'):
+        age_hours = max((now - contribution.publication_time).total_seconds(), 0) / 3600
+        contribution.rank_score = (contribution.points - 1) / pow(age_hours + 2, 1.8)
+        contribution.save(update_fields=['rank_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0012_userfields_api_key_prefix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='rank_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.RunPython(compute_rank_scores, migrations.RunPython.noop),
+    ]
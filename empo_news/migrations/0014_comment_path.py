@@ -0,0 +1,29 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+def compute_paths(apps, schema_editor):
+    Comment = apps.get_model('empo_news', 'Comment')
+    paths = {}
+
+    # Parents always have lower ids than their replies, so their paths are known first
+    for comment_id, parent_id in Comment.objects.order_by('id').values_list('id', 'parent_id'):
+        paths[comment_id] = paths.get(parent_id, '') + str(comment_id) + '/'
+        Comment.objects.filter(contribution_ptr_id=comment_id).update(path=paths[comment_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0013_contribution_rank_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', max_length=2000),
+        ),
+        migrations.RunPython(compute_paths, migrations.RunPython.noop),
+    ]
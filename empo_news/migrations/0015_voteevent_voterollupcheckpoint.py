@@ -0,0 +1,46 @@
+# Generated by Django 3.0.14 on 2026-10-18 08:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_existing_votes(apps, schema_editor):
+    Contribution = apps.get_model('empo_news', 'Contribution')
+    VoteEvent = apps.get_model('empo_news', 'VoteEvent')
+    likes = Contribution.user_likes.through.objects.exclude(user_id=models.F('contribution__user_id'))
+
+    # Authors like their own submissions on creation, which never counted as a vote
+    VoteEvent.objects.bulk_create([VoteEvent(user_id=user_id, contribution_id=contribution_id, value=1)
+                                   for user_id, contribution_id in likes.values_list('user_id', 'contribution_id')],
+                                  batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('empo_news', '0014_comment_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteRollupCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.SmallIntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('contribution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_events', to='empo_news.Contribution')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_events', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(record_existing_votes, migrations.RunPython.noop),
+    ]
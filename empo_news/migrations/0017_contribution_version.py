@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0016_pendingvote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:14
+
+from django.db import migrations
+
+POSTGRESQL_FORWARDS = [
+    "ALTER TABLE empo_news_contribution ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(text, '')), 'B')) STORED",
+    "CREATE INDEX empo_news_contribution_search_vector ON empo_news_contribution USING GIN (search_vector)",
+]
+
+POSTGRESQL_BACKWARDS = [
+    "ALTER TABLE empo_news_contribution DROP COLUMN search_vector",
+]
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE empo_news_contribution_fts USING fts5(title, text, tokenize='porter unicode61')",
+    "INSERT INTO empo_news_contribution_fts(rowid, title, text) "
+    "SELECT id, coalesce(title, ''), coalesce(text, '') FROM empo_news_contribution",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TABLE empo_news_contribution_fts",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0017_contribution_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements({'postgresql': POSTGRESQL_FORWARDS, 'sqlite': SQLITE_FORWARDS}),
+                             run_statements({'postgresql': POSTGRESQL_BACKWARDS, 'sqlite': SQLITE_BACKWARDS})),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_domain_stories(apps, schema_editor):
+    Contribution = apps.get_model('empo_news', 'Contribution')
+    DomainCounter = apps.get_model('empo_news', 'DomainCounter')
+    stories = Contribution.objects.filter(comment__isnull=True, url_domain__isnull=False) \
+        .values_list('url_domain').annotate(total=Count('id'))
+    DomainCounter.objects.bulk_create([DomainCounter(domain=domain, stories=total) for domain, total in stories])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0018_auto_20261018_1114'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DomainCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=500, unique=True)),
+                ('stories', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['url_domain', 'publication_time', 'id'], name='empo_news_c_url_dom_042924_idx'),
+        ),
+        migrations.RunPython(count_domain_stories, migrations.RunPython.noop),
+    ]
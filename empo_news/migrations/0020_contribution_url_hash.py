@@ -0,0 +1,74 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:26
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from django.db import migrations, models
+
+# A frozen copy of empo_news.canonical_urls as it was when this migration was written, so that later changes to the
+# canonicalisation rules do not change what the backfill computes
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMETERS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref_src'}
+
+
+def get_url_hash(url):
+    url = url.strip()
+    if '://' not in url:
+        url = 'http://' + url
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    if ':' in host:
+        host = '[' + host + ']'
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host += ':%d' % port
+
+    if scheme == 'https':
+        scheme = 'http'
+
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if not name.lower().startswith('utm_') and name.lower() not in TRACKING_PARAMETERS))
+    canonical_url = urlunsplit((scheme, host, parts.path.rstrip('/'), query, ''))
+    return hashlib.sha256(canonical_url.encode("utf-8")).hexdigest()
+
+
+def hash_story_urls(apps, schema_editor):
+    Contribution = apps.get_model('empo_news', 'Contribution')
+    hashes = set()
+    stories = []
+    for story in Contribution.objects.filter(url__isnull=False).exclude(url='').order_by('id').only('id', 'url') \
+            .iterator():
+        try:
+            url_hash = get_url_hash(story.url)
+        except ValueError:
+            continue
+        # Links submitted more than once before hashing existed keep the hash on their oldest story only
+        if url_hash not in hashes:
+            hashes.add(url_hash)
+            story.url_hash = url_hash
+            stories.append(story)
+    Contribution.objects.bulk_update(stories, ['url_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0019_auto_20261018_1123'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='url_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_story_urls, migrations.RunPython.noop),
+    ]
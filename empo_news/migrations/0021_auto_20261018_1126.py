@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0020_contribution_url_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contribution',
+            name='url_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
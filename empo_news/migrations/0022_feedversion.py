@@ -0,0 +1,25 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+def create_feed_version(apps, schema_editor):
+    apps.get_model('empo_news', 'FeedVersion').objects.create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0021_auto_20261018_1126'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_feed_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0022_feedversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedversion',
+            name='ids_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
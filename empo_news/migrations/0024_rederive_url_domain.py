@@ -0,0 +1,53 @@
+# Generated by Django 3.0.14 on 2026-10-18 10:05
+
+from urllib.parse import urlsplit
+
+from django.db import migrations
+from django.db.models import Count
+
+
+# A frozen copy of empo_news.canonical_urls.get_domain as it was when this migration was written. Stories submitted
+# before it kept the text after 'www.' verbatim, with its case and port, so one site was split across several domains.
+def get_domain(url):
+    url = url.strip()
+    if '://' not in url:
+        url = 'http://' + url
+
+    host = (urlsplit(url).hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        return host[4:]
+    return host
+
+
+def rederive_url_domains(apps, schema_editor):
+    Contribution = apps.get_model('empo_news', 'Contribution')
+    DomainCounter = apps.get_model('empo_news', 'DomainCounter')
+
+    stories = []
+    for story in Contribution.objects.filter(url__isnull=False).exclude(url='').only('id', 'url', 'url_domain') \
+            .iterator():
+        try:
+            domain = get_domain(story.url)
+        except ValueError:
+            continue
+        if domain != story.url_domain:
+            story.url_domain = domain
+            stories.append(story)
+    Contribution.objects.bulk_update(stories, ['url_domain'], batch_size=1000)
+
+    DomainCounter.objects.all().delete()
+    counts = Contribution.objects.filter(comment__isnull=True, url_domain__isnull=False).exclude(url_domain='') \
+        .values_list('url_domain').annotate(total=Count('id'))
+    DomainCounter.objects.bulk_create([DomainCounter(domain=domain, stories=total) for domain, total in counts],
+                                      batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empo_news', '0023_feedversion_ids_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(rederive_url_domains, migrations.RunPython.noop),
+    ]
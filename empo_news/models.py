@@ -1,5 +1,8 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Exists, OuterRef, Value, BooleanField
+
+from empo_news.ranking import get_rank_score
 
 
 class UserFields(models.Model):
@@ -12,6 +15,26 @@ class UserFields(models.Model):
     minaway = models.IntegerField(default=180)
     delay = models.IntegerField(default=0)
     api_key = models.CharField(max_length=1000, null=True)
+    api_key_prefix = models.CharField(max_length=12, null=True, db_index=True)
+
+
+class ContributionQuerySet(models.QuerySet):
+    def visible_to(self, user_id):
+        if user_id is None:
+            return self
+        return self.exclude(user_id_hidden=user_id)
+
+    def hidden_by(self, user_id):
+        return self.filter(user_id_hidden=user_id)
+
+    def with_viewer_state(self, user_id):
+        if user_id is None:
+            return self.annotate(viewer_liked=Value(False, output_field=BooleanField()),
+                                 viewer_hidden=Value(False, output_field=BooleanField()))
+
+        likes = self.model.user_likes.through.objects.filter(contribution_id=OuterRef('pk'), user_id=user_id)
+        hides = self.model.user_id_hidden.through.objects.filter(contribution_id=OuterRef('pk'), user_id=user_id)
+        return self.annotate(viewer_liked=Exists(likes), viewer_hidden=Exists(hides))
 
 
 class Contribution(models.Model):
@@ -21,6 +44,7 @@ class Contribution(models.Model):
     publication_time = models.DateTimeField('publication time')
     url = models.CharField(max_length=500, blank=True, null=True)
     url_domain = models.CharField(max_length=500, blank=True, null=True)
+    url_hash = models.CharField(max_length=64, unique=True, blank=True, null=True)
     text = models.CharField(max_length=2000, blank=True, null=True)
     user_likes = models.ManyToManyField(User, related_name="likes", blank=True)
     user_id_hidden = models.ManyToManyField(User, related_name="hide", blank=True)
@@ -28,6 +52,13 @@ class Contribution(models.Model):
     comments = models.IntegerField(default=0)
     liked = models.BooleanField(default=True)
     show = models.BooleanField(default=True)
+    rank_score = models.FloatField(default=0, db_index=True)
+    version = models.IntegerField(default=0)
+
+    objects = ContributionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['url_domain', 'publication_time', 'id'])]
 
     def get_type(self):
         if self.url is not None:
@@ -39,6 +70,8 @@ class Contribution(models.Model):
     def get_class(self):
         return self.__class__.__name__
 
+    def update_rank_score(self):
+        self.rank_score = get_rank_score(self.points, self.publication_time)
 
     def total_likes(self):
         return self.user_likes.count()
@@ -56,3 +89,45 @@ class Contribution(models.Model):
 class Comment(Contribution):
     contribution = models.ForeignKey(Contribution, related_name="contrib", on_delete=models.CASCADE)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True)
+    path = models.CharField(max_length=2000, default='', db_index=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        if not self.path:
+            self.path = (self.parent.path if self.parent_id is not None else '') + str(self.id) + '/'
+            Comment.objects.filter(id=self.id).update(path=self.path)
+
+    def get_ancestor_ids(self):
+        return [int(ancestor_id) for ancestor_id in self.path.split('/')[:-2]]
+
+    def get_subtree(self):
+        return Comment.objects.filter(path__startswith=self.path)
+
+
+class VoteEvent(models.Model):
+    user = models.ForeignKey(User, related_name="vote_events", on_delete=models.CASCADE)
+    contribution = models.ForeignKey(Contribution, related_name="vote_events", on_delete=models.CASCADE)
+    value = models.SmallIntegerField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class VoteRollupCheckpoint(models.Model):
+    last_event_id = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+
+class FeedVersion(models.Model):
+    version = models.BigIntegerField(default=0)
+    ids_version = models.BigIntegerField(default=0)
+
+
+class PendingVote(models.Model):
+    contribution = models.ForeignKey(Contribution, related_name="pending_votes", on_delete=models.CASCADE)
+    author = models.ForeignKey(User, related_name="pending_votes", on_delete=models.CASCADE)
+    value = models.SmallIntegerField()
+
+
+class DomainCounter(models.Model):
+    domain = models.CharField(max_length=500, unique=True)
+    stories = models.IntegerField(default=0)
@@ -0,0 +1,67 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from empo_news.versions import get_feed_version
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 30)
+PAGE_CACHE_HITS_KEY = 'empo_news:page_cache:hits'
+PAGE_CACHE_MISSES_KEY = 'empo_news:page_cache:misses'
+
+
+def get_page_key(request):
+    # Every vote, submission and comment bumps the feed version, which retires all cached pages at once
+    digest = hashlib.sha1(request.get_full_path().encode("utf-8")).hexdigest()
+    return 'empo_news:page:' + get_feed_version() + ':' + digest
+
+
+def count(key):
+    if cache.add(key, 1, None):
+        return
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_page_cache_stats():
+    stats = cache.get_many([PAGE_CACHE_HITS_KEY, PAGE_CACHE_MISSES_KEY])
+    return stats.get(PAGE_CACHE_HITS_KEY, 0), stats.get(PAGE_CACHE_MISSES_KEY, 0)
+
+
+def reset_page_cache_stats():
+    cache.delete_many([PAGE_CACHE_HITS_KEY, PAGE_CACHE_MISSES_KEY])
+
+
+def is_cacheable(request, response):
+    # Pages that issued a CSRF token or set a cookie belong to one visitor only
+    return response.status_code == 200 and not response.cookies and not request.META.get('CSRF_COOKIE_USED')
+
+
+def cache_anonymous_page(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated or PAGE_CACHE_TIMEOUT <= 0:
+            return view(request, *args, **kwargs)
+
+        key = get_page_key(request)
+        page = cache.get(key)
+
+        if page is not None:
+            count(PAGE_CACHE_HITS_KEY)
+            content, content_type = page
+            return HttpResponse(content, content_type=content_type)
+
+        count(PAGE_CACHE_MISSES_KEY)
+        response = view(request, *args, **kwargs)
+
+        if is_cacheable(request, response):
+            cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+
+        return response
+
+    return wrapper
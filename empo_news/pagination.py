@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 30
+API_PAGE_SIZE = 30
+API_MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    return str(base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")), "utf-8")
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], int):
+        raise ValueError('Invalid cursor')
+
+    return values
+
+
+def get_cursor_values(contribution, field):
+    value = getattr(contribution, field)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return [value, contribution.id]
+
+
+def filter_after_cursor(queryset, field, descending, cursor):
+    value, last_id = decode_cursor(cursor)
+
+    try:
+        value = queryset.model._meta.get_field(field).to_python(value)
+    except ValidationError:
+        raise ValueError('Invalid cursor')
+
+    if value is None:
+        raise ValueError('Invalid cursor')
+
+    lookup = 'lt' if descending else 'gt'
+    return queryset.filter(Q(**{field + '__' + lookup: value}) | Q(**{field: value, 'id__' + lookup: last_id}))
+
+
+def get_keyset_page(queryset, field, descending=True, cursor=None, offset=0, size=PAGE_SIZE, strict=False):
+    sign = '-' if descending else ''
+    queryset = queryset.order_by(sign + field, sign + 'id')
+
+    if cursor:
+        try:
+            queryset = filter_after_cursor(queryset, field, descending, cursor)
+            offset = 0
+        except ValueError:
+            if strict:
+                raise
+
+    rows = list(queryset[offset:offset + size + 1])
+    next_cursor = None
+
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(get_cursor_values(rows[-1], field))
+
+    return rows, next_cursor
+
+
+def get_limit(value):
+    if not value:
+        return API_PAGE_SIZE
+
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('Invalid limit')
+
+    return min(limit, API_MAX_PAGE_SIZE)
@@ -0,0 +1,27 @@
+import numpy
+from django.utils import timezone
+
+GRAVITY = 1.8
+AGE_OFFSET_HOURS = 2
+
+
+def get_age_hours(publication_time, now=None):
+    if now is None:
+        now = timezone.now()
+    if timezone.is_naive(publication_time):
+        publication_time = timezone.make_aware(publication_time)
+    return max((now - publication_time).total_seconds(), 0) / 3600
+
+
+def get_rank_divisor(publication_time, now=None):
+    return pow(get_age_hours(publication_time, now) + AGE_OFFSET_HOURS, GRAVITY)
+
+
+def get_rank_score(points, publication_time, now=None):
+    return (points - 1) / get_rank_divisor(publication_time, now)
+
+
+def get_rank_scores(points, ages_hours):
+    points = numpy.asarray(points, dtype=numpy.float64)
+    ages_hours = numpy.clip(numpy.asarray(ages_hours, dtype=numpy.float64), 0, None)
+    return (points - 1) / numpy.power(ages_hours + AGE_OFFSET_HOURS, GRAVITY)
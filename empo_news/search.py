@@ -0,0 +1,106 @@
+import re
+
+from django.db import connection
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from empo_news.models import Contribution, Comment
+from empo_news.pagination import PAGE_SIZE, decode_cursor, encode_cursor
+
+SEARCH_TABLE = 'empo_news_contribution_fts'
+MAX_SEARCH_TERMS = 16
+
+# PostgreSQL keeps search_vector up to date itself as a generated column with a GIN index. SQLite has no tsvector,
+# so local and test databases mirror titles and texts into an FTS5 table that is maintained from here instead.
+POSTGRESQL_MATCH = "empo_news_contribution.search_vector @@ plainto_tsquery('english', %s)"
+POSTGRESQL_RANK = "ts_rank(empo_news_contribution.search_vector, plainto_tsquery('english', %s))::float8"
+SQLITE_MATCH = SEARCH_TABLE + ".rowid = empo_news_contribution.id AND " + SEARCH_TABLE + " MATCH %s"
+SQLITE_RANK = "-bm25(" + SEARCH_TABLE + ", 2.0, 1.0)"
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def get_search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_SEARCH_TERMS]
+
+
+def get_search_sql(terms):
+    if uses_search_vector():
+        match = ' '.join(terms)
+        return [], POSTGRESQL_MATCH, [match], POSTGRESQL_RANK, [match]
+
+    # Quoting every word keeps FTS5 operators typed by users from being parsed as query syntax
+    return [SEARCH_TABLE], SQLITE_MATCH, [' '.join('"' + term + '"' for term in terms)], SQLITE_RANK, []
+
+
+def search(queryset, query, cursor=None, size=PAGE_SIZE):
+    terms = get_search_terms(query)
+    if not terms:
+        return [], None
+
+    # The full-text table is joined rather than queried per row, so ranking costs one index lookup per match
+    tables, match_sql, match_params, rank_sql, rank_params = get_search_sql(terms)
+    queryset = queryset.extra(select={'rank': rank_sql}, select_params=rank_params, tables=tables,
+                              where=[match_sql], params=match_params) \
+        .annotate(story_id=F('comment__contribution_id')).order_by('-rank', '-id')
+
+    if cursor:
+        rank, last_id = decode_cursor(cursor)
+        if not isinstance(rank, (int, float)):
+            raise ValueError('Invalid cursor')
+        queryset = queryset.extra(where=['(' + rank_sql + ' < %s OR (' + rank_sql + ' = %s AND '
+                                         'empo_news_contribution.id < %s))'],
+                                  params=rank_params + [rank] + rank_params + [rank, last_id])
+
+    rows = list(queryset[:size + 1])
+    next_cursor = None
+
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].id])
+
+    return rows, next_cursor
+
+
+def index_contributions(rows):
+    if uses_search_vector():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany('INSERT OR REPLACE INTO ' + SEARCH_TABLE + '(rowid, title, text) VALUES (%s, %s, %s)',
+                           [(contribution_id, title or '', text or '') for contribution_id, title, text in rows])
+
+
+def unindex_contributions(contribution_ids):
+    if uses_search_vector():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany('DELETE FROM ' + SEARCH_TABLE + ' WHERE rowid = %s',
+                           [(contribution_id,) for contribution_id in contribution_ids])
+
+
+def rebuild_search_index():
+    if uses_search_vector():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM ' + SEARCH_TABLE)
+        cursor.execute('INSERT INTO ' + SEARCH_TABLE + "(rowid, title, text) "
+                       "SELECT id, coalesce(title, ''), coalesce(text, '') FROM empo_news_contribution")
+
+
+@receiver(post_save, sender=Contribution)
+@receiver(post_save, sender=Comment)
+def index_contribution(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'text'} & set(update_fields):
+        index_contributions([(instance.id, instance.title, instance.text)])
+
+
+@receiver(post_delete, sender=Contribution)
+@receiver(post_delete, sender=Comment)
+def unindex_contribution(sender, instance, **kwargs):
+    unindex_contributions([instance.id])
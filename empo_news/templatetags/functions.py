@@ -40,11 +40,6 @@ def is_contribution_liked(contribution, user_id):
     return contribution.user_likes.filter(id=user_id).exists()
   
 
-@register.filter
-def all_replies(comment):
-    return comment.comment_set.all().order_by('-publication_time')
-
-
 @register.filter
 def is_hidden(contribution, user_id):
     return contribution.user_id_hidden.filter(id=user_id).exists()
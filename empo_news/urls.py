@@ -3,7 +3,8 @@ from django.urls import path, include
 
 from . import views
 from .views import ContributionsViewSet, ContributionsIdViewSet, VoteIdViewSet, UnVoteIdViewSet, HideIdViewSet, \
-    UnHideIdViewSet, CommentViewSet, CommentIdViewSet, ContributionCommentViewSet, ProfilesViewSet, ProfilesIdViewSet
+    UnHideIdViewSet, CommentViewSet, CommentIdViewSet, ContributionCommentViewSet, ProfilesViewSet, ProfilesIdViewSet, \
+    BatchViewSet, SearchViewSet
 
 app_name = 'empo_news'
 
@@ -34,6 +35,10 @@ unhide_id_view = UnHideIdViewSet.as_view({
     'put': 'unhide'
 })
 
+batch_view = BatchViewSet.as_view({
+    'post': 'batch'
+})
+
 comments_view = CommentViewSet.as_view({
     'get': 'get_actual'
 })
@@ -47,6 +52,10 @@ contribution_comments_view = ContributionCommentViewSet.as_view({
     'post': 'create_comment'
 })
 
+search_view = SearchViewSet.as_view({
+    'get': 'get_actual'
+})
+
 profiles_id_args = ProfilesViewSet.as_view({
     'put': 'update_actual'
 })
@@ -76,8 +85,10 @@ urlpatterns = [
     path('logout', views.logout),
     path('threads/<str:username>', views.threads, name='threads'),
     path('comments', views.comments, name='comments'),
+    path('search', views.search, name='search'),
     path('ask_list', views.ask_list, name='ask_list'),
     path('show_list', views.show_list, name='show_list'),
+    path('from', views.from_site, name='from_site'),
     path('hidden/<int:userid>', views.hidden, name='hidden'),
     path('voted_submissions', views.voted_submissions, name='voted_submissions'),
     path('voted_comments', views.voted_comments, name='voted_comments'),
@@ -89,9 +100,11 @@ urlpatterns = [
     path('api/v1/contribution/<int:id>/unvote', unvote_id_view, name='api_unvote_id'),
     path('api/v1/contribution/<int:id>/hide', hide_id_view, name='api_hide_id'),
     path('api/v1/contribution/<int:id>/unhide', unhide_id_view, name='api_unhide_id'),
+    path('api/v1/batch', batch_view, name='api_batch'),
     path('api/v1/comments', comments_view, name='api_comments'),
     path('api/v1/comment/<int:commentId>', comments_id_view, name='api_id_comments'),
     path('api/v1/contribution/<int:id>/comments', contribution_comments_view, name='api_contribution_comments'),
+    path('api/v1/search', search_view, name='api_search'),
     path('api/v1/profile', profiles_id_args, name='api_profiles_id_args'),
     path('api/v1/profile/<str:username>', profiles_id_kwargs, name='api_profiles_id_kwargs'),
 ]
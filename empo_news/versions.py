@@ -0,0 +1,80 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Count, Max
+from django.utils.cache import parse_etags
+
+from empo_news.models import Contribution, Comment, PendingVote, FeedVersion
+
+
+# The version lives in the database rather than the cache, which is per process unless a shared backend is
+# configured, so that every worker sees a bump and stops answering 304 for lists that changed elsewhere
+def get_feed_version():
+    return str(FeedVersion.objects.filter(id=1).values_list('version', flat=True).first() or 0)
+
+
+# Only changes to which stories are listed bump this one, so that votes keep reusing the cached feed ids
+def get_feed_ids_version():
+    return str(FeedVersion.objects.filter(id=1).values_list('ids_version', flat=True).first() or 0)
+
+
+def increment_feed_version(ids=False):
+    fields = {'version': F('version') + 1}
+    if ids:
+        fields['ids_version'] = F('ids_version') + 1
+
+    if not FeedVersion.objects.filter(id=1).update(**fields):
+        FeedVersion.objects.get_or_create(id=1, defaults={'version': 1, 'ids_version': int(ids)})
+
+
+def bump_feed_version(ids=False):
+    # Bumping after commit keeps the row lock out of the vote transaction and never announces uncommitted changes
+    transaction.on_commit(lambda: increment_feed_version(ids))
+
+
+def touch_items(contribution_ids):
+    # A comment change also alters the comment tree served under its story
+    roots = Comment.objects.filter(id__in=contribution_ids).values('contribution_id')
+    Contribution.objects.filter(Q(id__in=contribution_ids) | Q(id__in=roots)).update(version=F('version') + 1)
+
+
+# For callers that already moved the version of the contributions themselves in their own update
+def touch_roots(contribution_ids):
+    roots = Comment.objects.filter(id__in=contribution_ids).values('contribution_id')
+    Contribution.objects.filter(id__in=roots).update(version=F('version') + 1)
+    bump_feed_version()
+
+
+def touch_contributions(contribution_ids):
+    touch_items(contribution_ids)
+    bump_feed_version()
+
+
+# Hides are per viewer, so instead of retiring every client's lists they only change the lists of the viewer. Hide
+# rows are only ever added with a new id or deleted, so their count and highest id identify the viewer's hidden set.
+def get_hide_version(user_id):
+    hides = Contribution.user_id_hidden.through.objects.filter(user_id=user_id).aggregate(count=Count('id'),
+                                                                                           last=Max('id'))
+    return '%d.%s' % (hides['count'], hides['last'])
+
+
+def get_versions(contribution_id):
+    return Contribution.objects.filter(id=contribution_id) \
+        .values_list('version', 'comment__contribution__version').first()
+
+
+def get_pending_version():
+    if not getattr(settings, 'VOTE_WRITE_BEHIND', False):
+        return ''
+
+    return PendingVote.objects.order_by('-id').values_list('id', flat=True).first()
+
+
+def get_etag(*parts):
+    return 'W/"' + hashlib.sha1(':'.join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def is_not_modified(request, etag):
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return any(match == '*' or (match[2:] if match.startswith('W/') else match) == etag[2:] for match in etags)
@@ -1,28 +1,44 @@
 import base64
+import json
 from datetime import datetime
 
 from django.contrib.auth import logout as do_logout
 from django.contrib.auth.models import User
-from django.http import HttpResponse, HttpResponseRedirect
+from django.db.models import F, Value, BooleanField
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.http import urlencode
 from rest_framework import viewsets, renderers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 from empo_news.APIKeyManager import APIKeyManager
+from empo_news.authentication import KeyAuthentication
+from empo_news.batch import MAX_BATCH_SIZE, run_batch
+from empo_news.canonical_urls import add_scheme, get_domain, get_url_hash, save_story
+from empo_news.comment_tree import build_comment_tree
+from empo_news.domains import get_domain_stories
 from empo_news.errors import UrlAndTextFieldException, UrlIsTooLongException, TitleIsTooLongException, \
-    NotFoundException, ForbiddenException, UnauthenticatedException, ConflictException, ContributionUserException, \
-    InvalidQueryParametersException, UrlCannotBeModifiedException
+    NotFoundException, ForbiddenException, ConflictException, ContributionUserException, \
+    InvalidQueryParametersException, UrlCannotBeModifiedException, InvalidPaginationParametersException, \
+    InvalidBatchOperationException, InvalidIdsParameterException, InvalidFieldsParameterException, \
+    InvalidSearchQueryException, InvalidUrlException
+from empo_news.feeds import get_feed_page, invalidate_feeds
 from empo_news.forms import SubmitForm, CommentForm, UserUpdateForm
+from empo_news.fragments import attach_story_fragments, attach_comment_fragments
+from empo_news.key_cache import key_cache
 from empo_news.models import Contribution, UserFields, Comment
+from empo_news.page_cache import cache_anonymous_page
+from empo_news.pagination import API_MAX_PAGE_SIZE, get_keyset_page, get_limit
 from empo_news.permissions import KeyPermission
+from empo_news.search import search as search_contributions, get_search_terms
 from empo_news.serializers import ContributionSerializer, UrlContributionSerializer, AskContributionSerializer, \
     CommentSerializer, UserFieldsSerializer
-
-
-def get_domain(url):
-    return url.split('www.')[1].split('/')[0]
+from empo_news.versions import touch_contributions, touch_items, get_feed_version, get_hide_version, get_versions, \
+    get_pending_version, get_etag, is_not_modified
+from empo_news.votes import add_vote, remove_vote, toggle_vote, get_karma, merge_pending_points
 
 
 def submit(request):
@@ -35,40 +51,21 @@ def submit(request):
             contribution = Contribution(user=request.user, title=form.cleaned_data['title'],
                                         publication_time=datetime.today(), text='')
             if form.cleaned_data['url'] and SubmitForm.valid_url(form.cleaned_data['url']):
-                url_split = form.cleaned_data['url'].split('/')
-                if url_split[0] == "http:" or url_split[0] == "https:":
-                    domain_split = url_split[2].split('.')
-                    if domain_split[0] != "www":
-                        partial_url = form.cleaned_data['url'].split('//')
-                        actual_url = partial_url[0] + "//www." + partial_url[1]
-                    else:
-                        actual_url = form.cleaned_data['url']
-                else:
-                    domain_split = form.cleaned_data['url'].split('.')
-                    if domain_split[0] != "www":
-                        actual_url = "http://www." + form.cleaned_data['url']
-                    else:
-                        actual_url = "http://" + form.cleaned_data['url']
-
-                contribution.url_domain = get_domain(actual_url)
-                contribution.url = actual_url
-
-                try:
-                    contribution_same_url = Contribution.objects.get(url=actual_url)
+                contribution.url = add_scheme(form.cleaned_data['url'])
+                contribution.url_domain = get_domain(contribution.url)
+                contribution.url_hash = get_url_hash(contribution.url)
+                contribution.update_rank_score()
+
+                contribution_same_url = save_story(contribution)
+                if contribution_same_url is not contribution:
                     return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contribution_same_url.id))
-                except Contribution.DoesNotExist:
-                    pass
-
-                """try:
-                    contribution_url = Contribution.objects.get(url=contribution.url)
-                    return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contribution_url.id))
-                except Contribution.DoesNotExist:
-                    pass """
             else:
                 contribution.text = form.cleaned_data['text']
-            contribution.save()
+                contribution.update_rank_score()
+                contribution.save()
             contribution.user_likes.add(request.user)
             contribution.save()
+            invalidate_feeds()
 
             return HttpResponseRedirect(reverse('empo_news:main_page'))
 
@@ -78,31 +75,23 @@ def submit(request):
     return render(request, 'empo_news/submit.html', context)
 
 
+@cache_anonymous_page
 def main_page(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
-
-    contributions = Contribution.objects.filter(comment__isnull=True)
-    update_show(contributions.order_by('-points'), request.user.id, pg * 30)
-    most_points_list = contributions.filter(show=True).order_by('-points')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_points_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+
+    most_points_list, next_cursor = get_feed_page('main_page', request.user.id, request.GET.get('next'), (pg - 1) * 30)
     context = {
-        "list": most_points_list,
+        "list": attach_story_fragments(most_points_list),
         "user": request.user,
         "path": "main_page",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -110,32 +99,25 @@ def main_page(request):
     return render(request, 'empo_news/main_page.html', context)
 
 
+@cache_anonymous_page
 def new_page(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
-
-    contributions = Contribution.objects.filter(comment__isnull=True)
-    update_show(contributions.order_by('-publication_time'), request.user.id, pg * 30)
-    most_recent_list = contributions.filter(show=True).order_by('-publication_time')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_recent_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+
+    most_recent_list, next_cursor = get_feed_page('new_page', request.user.id, request.GET.get('next'),
+                                                  (pg - 1) * 30)
     context = {
-        "list": most_recent_list,
+        "list": attach_story_fragments(most_recent_list),
         "user": request.user,
         "path": "new_page",
         "highlight": "new",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -146,26 +128,21 @@ def new_page(request):
 def submitted(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     user_id = request.GET.get('username', "")
     if not User.objects.filter(username=user_id).exists():
         return HttpResponse('No such user')
-    base_list = User.objects.get(username=user_id).contribution.filter(comment__isnull=True)
+    base_list = User.objects.get(username=user_id).contribution.filter(comment__isnull=True) \
+        .with_viewer_state(request.user.id)
 
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('&')[0]
-    list_start = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_start = 0
-
-    submitted_list = base_list.order_by('publication_time')[list_start:(pg * 30)]
-    more = len(base_list.all()) > (pg * 30)
-    for contribution in submitted_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
 
+    submitted_list, next_cursor = get_keyset_page(base_list, 'publication_time', descending=False,
+                                                  cursor=request.GET.get('next'), offset=(pg - 1) * 30)
+    merge_pending_points(submitted_list)
     context = {
         "list": submitted_list,
         "user": request.user,
@@ -173,8 +150,8 @@ def submitted(request):
         "path": "submitted",
         "submitted_id": user_id,
         "highlight": "submitted",
-        "more": more,
-        "next_page": base_path + "&pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "&pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -184,66 +161,28 @@ def submitted(request):
 
 def likes_submit(request, view, id, pg, contribution_id):
     contribution = get_object_or_404(Contribution, id=contribution_id)
-    if UserFields.objects.filter(user=contribution.user).count() == 0:
-        userFields = UserFields(user=contribution.user, karma=1, about="", showdead=0, noprocrast=0, maxvisit=20,
-                                minaway=180, delay=0)
-        userFields.save()
-    if contribution.user_likes.filter(id=request.user.id).exists():
-        contribution.user_likes.remove(request.user)
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) - 1)
-    else:
-        contribution.user_likes.add(request.user)
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) + 1)
-    contribution.points = contribution.total_likes()
-    contribution.save()
+    toggle_vote(contribution, request.user)
     if pg == 1:
         return HttpResponseRedirect(reverse('empo_news:' + view) + '?id=' + id)
     return HttpResponseRedirect(reverse('empo_news:' + view) + '?id=' + id + '&pg=' + str(pg))
 
 
+def get_feed_redirect(request, view, pg):
+    query = {'site': request.GET['site']} if request.GET.get('site') else {}
+    if pg != 1:
+        query['pg'] = pg
+    return HttpResponseRedirect(reverse('empo_news:' + view) + ('?' + urlencode(query) if query else ''))
+
+
 def likes(request, view, pg, contribution_id):
     contribution = get_object_or_404(Contribution, id=contribution_id)
-    if UserFields.objects.filter(user=contribution.user).count() == 0:
-        userFields = UserFields(user=contribution.user, karma=1, about="", showdead=0, noprocrast=0, maxvisit=20,
-                                minaway=180, delay=0)
-        userFields.save()
-    if contribution.user_likes.filter(id=request.user.id).exists():
-        contribution.user_likes.remove(request.user)
-        contribution.points = contribution.points - 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) - 1)
-    else:
-        contribution.user_likes.add(request.user)
-        contribution.points = contribution.points + 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) + 1)
-    contribution.points = contribution.total_likes()
-    contribution.save()
-    if pg == 1:
-        return HttpResponseRedirect(reverse('empo_news:' + view))
-    return HttpResponseRedirect(reverse('empo_news:' + view) + '?pg=' + str(pg))
+    toggle_vote(contribution, request.user)
+    return get_feed_redirect(request, view, pg)
 
 
 def likes_reply(request, contribution_id, comment_id, path):
     comment = get_object_or_404(Comment, id=comment_id)
-    if UserFields.objects.filter(user=comment.user).count() == 0:
-        userFields = UserFields(user=comment.user, karma=1, about="", showdead=0, noprocrast=0, maxvisit=20,
-                                minaway=180, delay=0)
-        userFields.save()
-    if comment.user_likes.filter(id=request.user.id).exists():
-        comment.user_likes.remove(request.user)
-        comment.points = comment.points - 1
-        UserFields.objects.filter(user=comment.user).update(
-            karma=getattr(UserFields.objects.filter(user=comment.user).first(), 'karma', 1) - 1)
-    else:
-        comment.user_likes.add(request.user)
-        comment.points = comment.points + 1
-        UserFields.objects.filter(user=comment.user).update(
-            karma=getattr(UserFields.objects.filter(user=comment.user).first(), 'karma', 1) + 1)
-    comment.points = comment.total_likes()
-    comment.save()
+    toggle_vote(comment, request.user)
     if path == "item":
         return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contribution_id) + '#' + str(comment_id))
     return HttpResponseRedirect(reverse('empo_news:addreply') + '?id=' + str(comment_id))
@@ -251,51 +190,19 @@ def likes_reply(request, contribution_id, comment_id, path):
 
 def likes_contribution(request, contribution_id):
     contribution = get_object_or_404(Contribution, id=contribution_id)
-    if UserFields.objects.filter(user=contribution.user).count() == 0:
-        userFields = UserFields(user=contribution.user, karma=1, about="", showdead=0, noprocrast=0, maxvisit=20,
-                                minaway=180, delay=0)
-        userFields.save()
-    if contribution.user_likes.filter(id=request.user.id).exists():
-        contribution.user_likes.remove(request.user)
-        contribution.points = contribution.points - 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) - 1)
-    else:
-        contribution.user_likes.add(request.user)
-        contribution.points = contribution.points + 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) + 1)
-    contribution.points = contribution.total_likes()
-    contribution.save()
+    toggle_vote(contribution, request.user)
     return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contribution_id))
 
 
 def likes_comment(request, comment_id, username):
     contribution = get_object_or_404(Contribution, id=comment_id)
-    if UserFields.objects.filter(user=contribution.user).count() == 0:
-        userFields = UserFields(user=contribution.user, karma=1, about="", showdead=0, noprocrast=0, maxvisit=20,
-                                minaway=180, delay=0)
-        userFields.save()
-    if contribution.user_likes.filter(id=request.user.id).exists():
-        contribution.user_likes.remove(request.user)
-        contribution.points = contribution.points - 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) - 1)
-    else:
-        contribution.user_likes.add(request.user)
-        contribution.points = contribution.points + 1
-        UserFields.objects.filter(user=contribution.user).update(
-            karma=getattr(UserFields.objects.filter(user=contribution.user).first(), 'karma', 1) + 1)
-    contribution.points = contribution.total_likes()
-    contribution.save()
+    toggle_vote(contribution, request.user)
     return HttpResponseRedirect(reverse('empo_news:threads', kwargs={'username': username}))
 
 
 def hide(request, view, pg, contribution_id):
     hide_for_user(request, contribution_id)
-    if pg == 1:
-        return HttpResponseRedirect(reverse('empo_news:' + view))
-    return HttpResponseRedirect(reverse('empo_news:' + view, args=(pg,)))
+    return get_feed_redirect(request, view, pg)
 
 
 def hide_no_page(request, view, contribution_id):
@@ -305,13 +212,17 @@ def hide_no_page(request, view, contribution_id):
 
 def hide_for_user(request, contribution_id):
     contribution = get_object_or_404(Contribution, id=contribution_id)
-    if contribution.user_id_hidden.filter(id=request.user.id).exists():
-        contribution.user_id_hidden.remove(request.user)
-        contribution.hidden = contribution.hidden - 1
+    toggle_hide(contribution, request.user)
+
+
+def toggle_hide(contribution, user):
+    if contribution.user_id_hidden.filter(id=user.id).exists():
+        contribution.user_id_hidden.remove(user)
+        Contribution.objects.filter(id=contribution.id).update(hidden=F('hidden') - 1)
     else:
-        contribution.user_id_hidden.add(request.user)
-        contribution.hidden = contribution.hidden + 1
-    contribution.save()
+        contribution.user_id_hidden.add(user)
+        Contribution.objects.filter(id=contribution.id).update(hidden=F('hidden') + 1)
+    touch_items([contribution.id])
 
 
 def collapse(request, contribution_id, comment_id):
@@ -329,7 +240,7 @@ def profile(request, username):
     key = ''
 
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     user_selected = User.objects.get(username=username)
 
     if UserFields.objects.filter(user=user_selected).count() == 0:
@@ -340,16 +251,17 @@ def profile(request, username):
 
         coding_string = get_coding_string(user_selected)
         encoded_string_bytes = base64.b64encode(coding_string.encode("utf-8"))
-        key = str(encoded_string_bytes, "utf-8")
-        hash_key = APIKeyManager.get_hash_key(key)
+        secret = str(encoded_string_bytes, "utf-8")
+        key = APIKeyManager.get_key(secret)
 
-        user_fields.api_key = hash_key
+        user_fields.api_key = APIKeyManager.make_hash_key(secret)
+        user_fields.api_key_prefix = APIKeyManager.get_prefix(secret)
         user_fields.save()
     else:
         user_fields = UserFields.objects.get(user=user_selected)
         coding_string = get_coding_string(user_selected)
         encoded_string_bytes = base64.b64encode(coding_string.encode("utf-8"))
-        key = str(encoded_string_bytes, "utf-8")
+        key = APIKeyManager.get_key(str(encoded_string_bytes, "utf-8"))
     if not user_fields.showdead:
         posS = '0'
     else:
@@ -360,7 +272,7 @@ def profile(request, username):
     else:
         posN = '1'
     form = UserUpdateForm(
-        initial={'email': user_selected.email, 'karma': user_fields.karma, 'about': user_fields.about,
+        initial={'email': user_selected.email, 'karma': get_karma(user_selected), 'about': user_fields.about,
                  'showdead': posS, 'noprocrast': posN, 'maxvisit': user_fields.maxvisit,
                  'minaway': user_fields.minaway, 'delay': user_fields.delay})
 
@@ -375,6 +287,7 @@ def profile(request, username):
                                                                     maxvisit=int(form.cleaned_data['maxvisit']),
                                                                     minaway=int(form.cleaned_data['minaway']),
                                                                     delay=int(form.cleaned_data['delay']))
+                key_cache.invalidate(user_fields.id)
 
                 return HttpResponseRedirect(reverse('empo_news:user_page', kwargs={"username": user_selected.username}))
     context = {
@@ -400,24 +313,30 @@ def get_coding_string(user_selected):
     return coding_string
 
 
-def increment_comments_number(contrib):
-    contrib.comments += 1
-    contrib.save()
-    if contrib.parent is not None:
-        increment_comments_number(contrib.parent)
+def increment_comments_number(comment):
+    contribution_ids = comment.get_ancestor_ids() + [comment.id, comment.contribution_id]
+    Contribution.objects.filter(id__in=contribution_ids).update(comments=F('comments') + 1)
+    touch_contributions(contribution_ids)
+
+
+def increment_story_comments_number(contribution):
+    Contribution.objects.filter(id=contribution.id).update(comments=F('comments') + 1)
+    touch_contributions([contribution.id])
 
 
+@cache_anonymous_page
 def item(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     contrib_id = int(request.GET.get('id', -1))
     if Comment.objects.filter(id=contrib_id).count() > 0:
-        contrib = Comment.objects.get(id=contrib_id)
+        contrib = Comment.objects.with_viewer_state(request.user.id).get(id=contrib_id)
     else:
-        contrib = Contribution.objects.get(id=contrib_id)
-    contrib_comments = Comment.objects.filter(contribution_id=contrib_id, parent__isnull=True) \
-        .order_by('-publication_time')
+        contrib = Contribution.objects.with_viewer_state(request.user.id).get(id=contrib_id)
+    merge_pending_points([contrib])
+    contrib_comments = build_comment_tree(contrib, request.user.id)
+    attach_comment_fragments(contrib_comments)
 
     context = {
         "contribution": contrib,
@@ -445,17 +364,13 @@ def item(request):
                                   publication_time=datetime.today(),
                                   text=comment_form.cleaned_data['comment'])
                 comment.save()
-
-                contrib.comments += 1
-                contrib.save()
+                increment_story_comments_number(contrib)
             else:
                 comment = Comment(user=request.user, contribution=contrib.contribution, parent=contrib,
                                   publication_time=datetime.today(),
                                   text=comment_form.cleaned_data['comment'])
                 comment.save()
                 increment_comments_number(contrib)
-                contrib.contribution.comments += 1
-                contrib.contribution.save()
 
             return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contrib_id))
         else:
@@ -467,9 +382,9 @@ def item(request):
 def add_comment(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     contrib_id = int(request.GET.get('id', -1))
-    contrib = Contribution.objects.get(id=contrib_id)
+    contrib = Contribution.objects.with_viewer_state(request.user.id).get(id=contrib_id)
     context = {
         "contribution": contrib,
         "comment_form": CommentForm(),
@@ -489,9 +404,7 @@ def add_comment(request):
                               publication_time=datetime.today(),
                               text=comment_form.cleaned_data['comment'])
             comment.save()
-
-            contrib.comments += 1
-            contrib.save()
+            increment_story_comments_number(contrib)
             return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(contrib_id))
         else:
             return HttpResponseRedirect(reverse('empo_news:addcomment') + '?id=' + str(contrib_id))
@@ -499,25 +412,10 @@ def add_comment(request):
     return HttpResponseRedirect(reverse('empo_news:main_page'))
 
 
-def update_show(all_contributions, userid, border):
-    count_shown = 0
-    i = 0
-    length = len(all_contributions)
-    while count_shown < border and i < length:
-        contribution = all_contributions[i]
-        if contribution.user_id_hidden.filter(id=userid).exists():
-            contribution.show = False
-        else:
-            contribution.show = True
-            count_shown += 1
-        contribution.save()
-        i += 1
-
-
 def add_reply(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     comment_id = int(request.GET.get('id', -1))
     comment = Comment.objects.get(id=comment_id)
     context = {
@@ -541,8 +439,6 @@ def add_reply(request):
             new_comment.save()
 
             increment_comments_number(comment)
-            comment.contribution.comments += 1
-            comment.contribution.save()
             return HttpResponseRedirect(reverse('empo_news:item') + '?id=' + str(new_comment.contribution.id)
                                         + '#' + str(new_comment.parent.id))
 
@@ -552,7 +448,7 @@ def add_reply(request):
 def threads(request, username):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     userSelected = User.objects.get(username=username)
     commentsUser = Comment.objects.filter(user=userSelected)
     context = {
@@ -567,27 +463,23 @@ def threads(request, username):
 def comments(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
 
-    most_recent_list = Comment.objects.all().order_by('-publication_time')[list_base:(pg * 30)]
-    more = len(Comment.objects.all()) > (pg * 30)
-    for contribution in most_recent_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+    comments_list = Comment.objects.with_viewer_state(request.user.id)
+    most_recent_list, next_cursor = get_keyset_page(comments_list, 'publication_time', cursor=request.GET.get('next'),
+                                                    offset=(pg - 1) * 30)
+    merge_pending_points(most_recent_list)
     context = {
         "list": most_recent_list,
         "user": request.user,
         "path": "comments",
         "highlight": "comments",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -595,32 +487,52 @@ def comments(request):
     return render(request, 'empo_news/comments.html', context)
 
 
+@cache_anonymous_page
+def search(request):
+    karma = 0
+    if request.user.is_authenticated:
+        karma = get_karma(request.user)
+    query = request.GET.get('q', '')
+    pg = int(request.GET.get('pg', 1))
+
+    results = Contribution.objects.visible_to(request.user.id).select_related('user', 'comment__contribution')
+
+    try:
+        results, next_cursor = search_contributions(results, query, request.GET.get('next'))
+    except ValueError:
+        return HttpResponseRedirect(reverse('empo_news:search') + '?' + urlencode({'q': query}))
+
+    context = {
+        "list": merge_pending_points(results),
+        "user": request.user,
+        "query": query,
+        "more": next_cursor is not None,
+        "next_page": reverse('empo_news:search') + '?' + urlencode({'q': query, 'pg': pg + 1,
+                                                                     'next': next_cursor or ''}),
+        "base_loop_count": (pg - 1) * 30,
+        "karma": karma,
+    }
+    return render(request, 'empo_news/search.html', context)
+
+
 def ask_list(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
-
-    contributions = Contribution.objects.filter(comment__isnull=True, url__isnull=True)
-    update_show(contributions.order_by('-points'), request.user.id, pg * 30)
-    most_points_list = contributions.filter(show=True).order_by('-points')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_points_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+
+    most_points_list, next_cursor = get_feed_page('ask_list', request.user.id, request.GET.get('next'),
+                                                  (pg - 1) * 30)
     context = {
-        "list": most_points_list,
+        "list": attach_story_fragments(most_points_list),
         "user": request.user,
         "path": "ask_list",
         "highlight": "ask",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -631,29 +543,21 @@ def ask_list(request):
 def show_list(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
-
-    contributions = Contribution.objects.filter(comment__isnull=True, title__startswith='Show EN: ')
-    update_show(contributions.order_by('-points'), request.user.id, pg * 30)
-    most_points_list = contributions.filter(show=True).order_by('-points')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_points_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+
+    most_points_list, next_cursor = get_feed_page('show_list', request.user.id, request.GET.get('next'),
+                                                  (pg - 1) * 30)
     context = {
-        "list": most_points_list,
+        "list": attach_story_fragments(most_points_list),
         "user": request.user,
         "path": "show_list",
         "highlight": "show",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -661,48 +565,57 @@ def show_list(request):
     return render(request, 'empo_news/main_page.html', context)
 
 
-def update_show_hidden(all_contributions, userid, border):
-    count_shown = 0
-    i = 0
-    length = len(all_contributions)
-    while count_shown < border and i < length:
-        contribution = all_contributions[i]
-        if contribution.user_id_hidden.filter(id=userid).exists():
-            contribution.show = True
-            count_shown += 1
-        else:
-            contribution.show = False
-        contribution.save()
-        i += 1
+def from_site(request):
+    karma = 0
+    if request.user.is_authenticated:
+        karma = get_karma(request.user)
+    site = request.GET.get('site', '')
+    pg = int(request.GET.get('pg', 1))
+    base_path = request.get_full_path().split('?')[0]
+    if pg < 1:
+        return HttpResponseRedirect(base_path + '?' + urlencode({'site': site}))
+
+    contributions = Contribution.objects.filter(comment__isnull=True, url_domain=site) \
+        .visible_to(request.user.id).with_viewer_state(request.user.id).select_related('user')
+    site_list, next_cursor = get_keyset_page(contributions, 'publication_time', cursor=request.GET.get('next'),
+                                             offset=(pg - 1) * 30)
+    context = {
+        "list": attach_story_fragments(merge_pending_points(site_list)),
+        "user": request.user,
+        "path": "from_site",
+        "site": site,
+        "site_stories": get_domain_stories(site),
+        "more": next_cursor is not None,
+        "next_page": base_path + '?' + urlencode({'site': site, 'pg': pg + 1, 'next': next_cursor or ''}),
+        "page_value": pg,
+        "base_loop_count": (pg - 1) * 30,
+        "karma": karma,
+    }
+    return render(request, 'empo_news/main_page.html', context)
 
 
 def hidden(request, userid):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
 
     selectedUser = User.objects.filter(id=userid).first()
-    contributions = Contribution.objects.filter(comment__isnull=True)
-    update_show_hidden(contributions.order_by('-points'), userid, pg * 30)
-    most_points_list = contributions.filter(show=True).order_by('-points')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_points_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+    contributions = Contribution.objects.filter(comment__isnull=True).hidden_by(userid) \
+        .with_viewer_state(request.user.id)
+    most_points_list, next_cursor = get_keyset_page(contributions, 'points', cursor=request.GET.get('next'),
+                                                    offset=(pg - 1) * 30)
+    merge_pending_points(most_points_list)
     context = {
-        "list": most_points_list,
+        "list": attach_story_fragments(most_points_list),
         "user": request.user,
         "path": "hidden",
         "highlight": "hidden",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -713,13 +626,7 @@ def hidden(request, userid):
 
 def unhide(request, view, pg, contribution_id, userid):
     contribution = get_object_or_404(Contribution, id=contribution_id)
-    if contribution.user_id_hidden.filter(id=request.user.id).exists():
-        contribution.user_id_hidden.remove(request.user)
-        contribution.hidden = contribution.hidden - 1
-    else:
-        contribution.user_id_hidden.add(request.user)
-        contribution.hidden = contribution.hidden + 1
-    contribution.save()
+    toggle_hide(contribution, request.user)
     if pg == 1:
         return HttpResponseRedirect(reverse('empo_news:' + view, kwargs={'userid': userid}))
     return HttpResponseRedirect(reverse('empo_news:' + view, args=(pg,), kwargs={'userid': userid}, ))
@@ -728,31 +635,25 @@ def unhide(request, view, pg, contribution_id, userid):
 def voted_submissions(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
 
     contributions = Contribution.objects.filter(comment__isnull=True,
                                                 user_likes__username__contains=request.user.username).exclude(
-        user=request.user)
-    update_show(contributions.order_by('-points'), request.user.id, pg * 30)
-    most_points_list = contributions.filter(show=True).order_by('-points')[list_base:(pg * 30)]
-    more = len(contributions.filter(show=True)) > (pg * 30)
-    for contribution in most_points_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+        user=request.user).visible_to(request.user.id).with_viewer_state(request.user.id)
+    most_points_list, next_cursor = get_keyset_page(contributions, 'points', cursor=request.GET.get('next'),
+                                                    offset=(pg - 1) * 30)
+    merge_pending_points(most_points_list)
     context = {
-        "list": most_points_list,
+        "list": attach_story_fragments(most_points_list),
         "user": request.user,
         "path": "voted_submissions",
         "highlight": "voted_submissions",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -763,28 +664,24 @@ def voted_submissions(request):
 def voted_comments(request):
     karma = 0
     if request.user.is_authenticated:
-        karma = getattr(UserFields.objects.filter(user=request.user).first(), 'karma', 1)
+        karma = get_karma(request.user)
     pg = int(request.GET.get('pg', 1))
     base_path = request.get_full_path().split('?')[0]
-    list_base = ((pg - 1) * 30) + 1
     if pg < 1:
         return HttpResponseRedirect(base_path)
-    elif pg == 1:
-        list_base = 0
-
-    comments = Comment.objects.filter(user_likes__username__contains=request.user.username).exclude(user=request.user)
-    most_recent_list = comments.order_by('-publication_time')[list_base:(pg * 30)]
-    more = len(comments) > (pg * 30)
-    for contribution in most_recent_list:
-        contribution.liked = not contribution.user_likes.filter(id=request.user.id).exists()
-        contribution.save()
+
+    comments = Comment.objects.filter(user_likes__username__contains=request.user.username).exclude(user=request.user) \
+        .with_viewer_state(request.user.id)
+    most_recent_list, next_cursor = get_keyset_page(comments, 'publication_time', cursor=request.GET.get('next'),
+                                                    offset=(pg - 1) * 30)
+    merge_pending_points(most_recent_list)
     context = {
         "list": most_recent_list,
         "user": request.user,
         "path": "voted_comments",
         "highlight": "voted_comments",
-        "more": more,
-        "next_page": base_path + "?pg=" + str(pg + 1),
+        "more": next_cursor is not None,
+        "next_page": base_path + "?pg=" + str(pg + 1) + "&next=" + str(next_cursor),
         "page_value": pg,
         "base_loop_count": (pg - 1) * 30,
         "karma": karma,
@@ -796,25 +693,168 @@ def is_url_valid(url):
     return '.' in url
 
 
+CONTRIBUTION_ORDER_FIELDS = {
+    'publication_time_asc': ('publication_time', False),
+    'publication_time_desc': ('publication_time', True),
+    'title_asc': ('title', False),
+    'title_desc': ('title', True),
+    'votes_asc': ('points', False),
+}
+
+COMMENT_ORDER_FIELDS = {
+    'publication_time_asc': ('publication_time', False),
+    'publication_time_desc': ('publication_time', True),
+    'votes_asc': ('points', False),
+}
+
+
+def get_order_field(order_by_filter, order_fields):
+    if not order_by_filter:
+        return 'id', False
+    return order_fields.get(order_by_filter, ('points', True))
+
+
+def apply_viewer_filters(contributions, user_fields, liked_filter, hidden_filter):
+    if liked_filter or hidden_filter:
+        contributions = contributions.with_viewer_state(user_fields.user.id)
+
+    if liked_filter:
+        contributions = contributions.filter(viewer_liked=liked_filter == 'true')
+
+    if hidden_filter:
+        contributions = contributions.filter(viewer_hidden=hidden_filter == 'true')
+
+    return contributions
+
+
+def get_api_page(request, queryset, order_field, descending):
+    cursor = request.query_params.get('cursor', '')
+
+    try:
+        limit = get_limit(request.query_params.get('limit', ''))
+        rows, next_cursor = get_keyset_page(queryset, order_field, descending, cursor, size=limit, strict=True)
+    except ValueError:
+        raise InvalidPaginationParametersException
+
+    return merge_pending_points(rows), get_next_link_headers(request, next_cursor)
+
+
+def get_next_link_headers(request, next_cursor):
+    if next_cursor is None:
+        return {}
+
+    query_params = request.query_params.copy()
+    query_params['cursor'] = next_cursor
+    next_url = request.build_absolute_uri(request.path + '?' + query_params.urlencode())
+    return {'Link': '<' + next_url + '>; rel="next"'}
+
+
+def get_list_etag(request):
+    return get_etag(get_feed_version(), get_pending_version(), get_hide_version(request.auth.user_id), request.auth.id,
+                    request.get_full_path())
+
+
+def get_item_etag(request, contribution_id):
+    versions = get_versions(contribution_id)
+
+    if versions is None:
+        return None
+
+    return get_etag(*versions, get_pending_version(), request.auth.id, request.get_full_path())
+
+
+def get_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(contribution_id) for contribution_id in value.split(',')))
+    except ValueError:
+        raise InvalidIdsParameterException
+
+    if len(ids) > API_MAX_PAGE_SIZE:
+        raise InvalidIdsParameterException
+
+    return ids
+
+
+def get_api_rows(request, queryset, order_field, descending):
+    ids = request.query_params.get('ids', '')
+
+    if not ids:
+        return get_api_page(request, queryset, order_field, descending)
+
+    ids = get_ids(ids)
+    rows_by_id = queryset.in_bulk(ids)
+    return merge_pending_points([rows_by_id[row_id] for row_id in ids if row_id in rows_by_id]), {}
+
+
+STREAM_CHUNK_SIZE = 500
+
+
+def is_streaming(request):
+    return request.query_params.get('stream', '') == '1'
+
+
+def get_chunks(rows, size):
+    chunk = []
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def stream_json_array(rows, serialize_rows):
+    yield '['
+    separator = ''
+
+    for chunk in get_chunks(rows, STREAM_CHUNK_SIZE):
+        items = serialize_rows(merge_pending_points(chunk))
+        yield separator + ','.join(json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+                                   for item in items)
+        separator = ','
+
+    yield ']'
+
+
+def get_stream_response(request, queryset, order_field, descending, serialize_rows):
+    ids = request.query_params.get('ids', '')
+
+    if ids:
+        # Like the paged endpoint, an ids list is answered in request order; it is short enough to load at once
+        ids = get_ids(ids)
+        rows_by_id = queryset.in_bulk(ids)
+        rows = [rows_by_id[row_id] for row_id in ids if row_id in rows_by_id]
+    else:
+        # Rows are read through a server-side cursor and serialized a chunk at a time, so memory does not grow with
+        # the size of the result
+        sign = '-' if descending else ''
+        rows = queryset.order_by(sign + order_field, sign + 'id').iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+    return StreamingHttpResponse(stream_json_array(rows, serialize_rows), content_type='application/json')
+
+
 class ContributionsViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
-        contributions = Contribution.objects.filter(comment__isnull=True)
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
+        user_fields = request.auth
+        etag = get_list_etag(request)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
 
-        try:
-            user_fields = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        contributions = Contribution.objects.filter(comment__isnull=True)
 
         username_filter = self.request.query_params.get('username', '')
         exclude_user_filter = self.request.query_params.get('exclude_user', '')
         show_en_filter = self.request.query_params.get('showEn', '')
         url_filter = self.request.query_params.get('url', '')
+        domain_filter = self.request.query_params.get('domain', '')
         ask_filter = self.request.query_params.get('ask', '')
         order_by_filter = self.request.query_params.get('orderBy', '')
         liked_filter = self.request.query_params.get('liked', '')
@@ -835,86 +875,46 @@ class ContributionsViewSet(viewsets.ModelViewSet):
                 User.objects.get(username=exclude_user_filter)
             except User.DoesNotExist:
                 raise NotFoundException
-            user_contributions = contributions.filter(user__username=exclude_user_filter)
-            contributions = contributions.difference(user_contributions)
+            contributions = contributions.exclude(user__username=exclude_user_filter)
 
         if show_en_filter:
             contributions = contributions.filter(title__startswith="Show EN:")
 
         if url_filter:
-            contributions = contributions.filter(url=url_filter)
+            try:
+                contributions = contributions.filter(url_hash=get_url_hash(url_filter))
+            except ValueError:
+                raise InvalidUrlException
+
+        if domain_filter:
+            contributions = contributions.filter(url_domain=domain_filter)
 
         if ask_filter:
             contributions = contributions.filter(url__isnull=True)
 
-        if order_by_filter:
-            if order_by_filter == 'publication_time_asc':
-                contributions = contributions.order_by('publication_time__year', 'publication_time__month',
-                                                       'publication_time__day', 'publication_time__hour',
-                                                       'publication_time__minute', 'publication_time__second')
-            elif order_by_filter == 'publication_time_desc':
-                contributions = contributions.order_by('-publication_time__year', '-publication_time__month',
-                                                       '-publication_time__day', '-publication_time__hour',
-                                                       '-publication_time__minute', '-publication_time__second')
-            elif order_by_filter == 'title_asc':
-                contributions = contributions.order_by('title')
-            elif order_by_filter == 'title_desc':
-                contributions = contributions.order_by('-title')
-            elif order_by_filter == 'votes_asc':
-                contributions = contributions.order_by('points')
-            else:
-                contributions = contributions.order_by('-points')
-
-        contribution_list = []
-
-        for contrib in contributions:
-            contribution_map = get_basic_attributes_map(contrib, user_fields)
-            adding = True
-
-            if liked_filter or hidden_filter:
-                adding = False
-
-                if liked_filter and hidden_filter:
-                    liked_result = liked_filter == 'true'
-                    hidden_result = hidden_filter == 'true'
-
-                    if liked_result and hidden_result and contribution_map['liked'] \
-                            and not contribution_map['show']:
-                        adding = True
-                    elif not liked_result and hidden_result and not contribution_map['liked'] \
-                            and not contribution_map['show']:
-                        adding = True
-                    elif liked_result and not hidden_result and contribution_map['liked'] \
-                            and contribution_map['show']:
-                        adding = True
-                    elif not liked_result and not hidden_result and not contribution_map['liked'] \
-                            and contribution_map['show']:
-                        adding = True
-                else:
-                    if liked_filter and ((liked_filter == 'true' and contribution_map['liked'])
-                                         or (liked_filter == 'false' and not contribution_map['liked'])):
-                        adding = True
-                    elif (hidden_filter == 'true' and not contribution_map['show']) \
-                            or (hidden_filter == 'false' and contribution_map['show']):
-                        adding = True
-
-            if adding:
-                contribution_list.append(contribution_map)
-
-        return Response(contribution_list, status=status.HTTP_200_OK)
+        fields = get_fields(request, CONTRIBUTION_FIELDS)
+        contributions = apply_viewer_filters(contributions, user_fields, liked_filter, hidden_filter)
+        contributions = select_fields(contributions, fields, CONTRIBUTION_FIELDS)
+        order_field, descending = get_order_field(order_by_filter, CONTRIBUTION_ORDER_FIELDS)
+
+        if is_streaming(request):
+            response = get_stream_response(request, contributions, order_field, descending,
+                                           lambda rows: get_attributes_maps(rows, user_fields, fields,
+                                                                            CONTRIBUTION_FIELDS))
+            response['ETag'] = etag
+            return response
+
+        contributions, headers = get_api_rows(request, contributions, order_field, descending)
+        contribution_list = get_attributes_maps(contributions, user_fields, fields, CONTRIBUTION_FIELDS)
+
+        return Response(contribution_list, status=status.HTTP_200_OK, headers=dict(headers, ETag=etag))
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def create_contribution(self, request, *args, **kwargs):
         title = self.request.data.get('title', '')
         url = self.request.data.get('url', '')
         text = self.request.data.get('text', '')
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         if len(title) > 80:
             raise TitleIsTooLongException
@@ -925,44 +925,34 @@ class ContributionsViewSet(viewsets.ModelViewSet):
         if url and text and is_url_valid(url):
             raise UrlAndTextFieldException
 
-        domain = None
-
         if url:
-            url_split = url.split('/')
-            if url_split[0] == "http:" or url_split[0] == "https:":
-                domain_split = url_split[2].split('.')
-                if domain_split[0] != "www":
-                    partial_url = url.split('//')
-                    actual_url = partial_url[0] + "//www." + partial_url[1]
-                else:
-                    actual_url = url
-            else:
-                domain_split = url.split('.')
-                if domain_split[0] != "www":
-                    actual_url = "http://www." + url
-                else:
-                    actual_url = "http://" + url
+            actual_url = add_scheme(url)
+            try:
+                domain = get_domain(actual_url)
+                url_hash = get_url_hash(actual_url)
+            except ValueError:
+                raise InvalidUrlException
 
-            domain = get_domain(actual_url)
+            contribution = Contribution(user=user_field.user, title=title, publication_time=datetime.today(),
+                                        liked=True, show=True, url=actual_url, url_domain=domain, url_hash=url_hash,
+                                        text=None)
+            contribution.update_rank_score()
 
-            try:
-                actual_contribution = Contribution.objects.get(url=actual_url)
+            actual_contribution = save_story(contribution)
+            if actual_contribution is not contribution:
                 return Response(get_basic_attributes_map(actual_contribution, user_field), status=status.HTTP_200_OK)
-            except Contribution.DoesNotExist:
-                contribution = Contribution(user=user_field.user, title=title, publication_time=datetime.today(),
-                                            liked=True, show=True, url=actual_url, text=None)
-                contribution.save()
         else:
             contribution = Contribution(user=user_field.user, title=title, publication_time=datetime.today(),
                                         liked=True, show=True, url=None, text=text)
+            contribution.update_rank_score()
             contribution.save()
 
         user_contributions = Contribution.objects.filter(user=user_field.user).order_by('-publication_time')
         contribution = user_contributions[0]
 
         contribution.user_likes.add(user_field.user)
-        contribution.url_domain = domain
         contribution.save()
+        invalidate_feeds()
 
         return Response(get_basic_attributes_map(contribution, user_field), status=status.HTTP_201_CREATED)
 
@@ -982,25 +972,28 @@ class ContributionsViewSet(viewsets.ModelViewSet):
 class ContributionsIdViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
     serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
+        user_fields = request.auth
+        etag = get_item_etag(request, kwargs.get('id'))
+        if etag is not None and is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        fields = get_fields(request, CONTRIBUTION_FIELDS)
+
         try:
-            contribution = Contribution.objects.get(id=kwargs.get('id'))
+            contribution = select_fields(Contribution.objects.all(), fields, CONTRIBUTION_FIELDS) \
+                .get(id=kwargs.get('id'))
         except Contribution.DoesNotExist:
             raise NotFoundException
 
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_fields = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        merge_pending_points([contribution])
 
-        contribution_map = get_basic_attributes_map(contribution, user_fields)
-        return Response(contribution_map, status=status.HTTP_200_OK)
+        contribution_map = get_basic_attributes_map(contribution, user_fields, fields)
+        return Response(contribution_map, status=status.HTTP_200_OK, headers={'ETag': etag})
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def delete_actual(self, request, *args, **kwargs):
@@ -1010,13 +1003,12 @@ class ContributionsIdViewSet(viewsets.ModelViewSet):
             raise NotFoundException
 
         user = UserFields.objects.get(user_id=contribution.user.id)
-        key = request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        if str(user.api_key) != str(api_key):
+        if user.id != request.auth.id:
             raise ForbiddenException
 
+        touch_contributions([contribution.id])
         contribution.delete()
+        invalidate_feeds()
 
         if contribution.get_class() == 'Comment':
             contribution.contribution.points -= 1
@@ -1029,14 +1021,7 @@ class ContributionsIdViewSet(viewsets.ModelViewSet):
     def update_actual(self, request, *args, **kwargs):
         title = self.request.query_params.get('title', '')
         text = self.request.query_params.get('text', '')
-        key = self.request.META.get('HTTP_API_KEY', '')
-
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         if len(title) > 80:
             raise TitleIsTooLongException
@@ -1051,7 +1036,8 @@ class ContributionsIdViewSet(viewsets.ModelViewSet):
 
         contribution.title = title
         contribution.text = text
-        contribution.save()
+        contribution.save(update_fields=['title', 'text'])
+        touch_contributions([contribution.id])
 
         contribution_map = get_basic_attributes_map(contribution, user_field)
         return Response(contribution_map, status=status.HTTP_200_OK)
@@ -1060,30 +1046,20 @@ class ContributionsIdViewSet(viewsets.ModelViewSet):
 class VoteIdViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
     serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def vote(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         try:
             contribution = Contribution.objects.get(id=kwargs.get('id'))
         except Contribution.DoesNotExist:
             raise NotFoundException
 
-        for user_like in contribution.user_likes.all():
-            if str(user_field.user.username) == str(user_like):
-                raise ConflictException
-
-        contribution.user_likes.add(user_field.user.id)
-        contribution.points += 1
-        contribution.save()
+        if not add_vote(contribution, user_field.user):
+            raise ConflictException
 
         response = {'status': 204, 'message': 'OK'}
         return Response(response, status=status.HTTP_204_NO_CONTENT)
@@ -1092,17 +1068,12 @@ class VoteIdViewSet(viewsets.ModelViewSet):
 class UnVoteIdViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
     serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def unvote(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         try:
             contribution = Contribution.objects.get(id=kwargs.get('id'))
@@ -1112,54 +1083,30 @@ class UnVoteIdViewSet(viewsets.ModelViewSet):
         if user_field.user == contribution.user:
             raise ContributionUserException
 
-        found = False
-        user_likes = contribution.user_likes.all()
-        actual = 0
-
-        while (not found and actual < len(user_likes)):
-            found = str(user_likes[actual]) == str(user_field.user.username)
-            actual += 1
-
-        if not found:
+        if not remove_vote(contribution, user_field.user):
             raise ConflictException
 
-        contribution.user_likes.remove(user_field.user.id)
-        contribution.points -= 1
-        contribution.save()
-
         response = {'status': 204, 'message': 'OK'}
         return Response(response, status=status.HTTP_204_NO_CONTENT)
 
 
 def show_childs(comment):
-    comment.show = True
-    comment.save()
-
-    for child_comment in comment.comment_set.all():
-        hide_childs(child_comment)
+    comment.get_subtree().update(show=True)
 
 
 def hide_childs(comment):
-    comment.show = False
-    comment.save()
+    comment.get_subtree().update(show=False)
 
-    for child_comment in comment.comment_set.all():
-        hide_childs(child_comment)
 
 class HideIdViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
     serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def hide(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         try:
             contribution = Contribution.objects.get(id=kwargs.get('id'))
@@ -1171,8 +1118,8 @@ class HideIdViewSet(viewsets.ModelViewSet):
                 raise ConflictException
 
         contribution.user_id_hidden.add(user_field.user.id)
-        contribution.hidden += 1
-        contribution.save()
+        Contribution.objects.filter(id=contribution.id).update(hidden=F('hidden') + 1)
+        touch_items([contribution.id])
 
         try:
             comment = Comment.objects.get(id=contribution.id)
@@ -1187,17 +1134,12 @@ class HideIdViewSet(viewsets.ModelViewSet):
 class UnHideIdViewSet(viewsets.ModelViewSet):
     queryset = Contribution.objects.filter(comment__isnull=True)
     serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def unhide(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         try:
             contribution = Contribution.objects.get(id=kwargs.get('id'))
@@ -1216,8 +1158,8 @@ class UnHideIdViewSet(viewsets.ModelViewSet):
             raise ConflictException
 
         contribution.user_id_hidden.remove(user_field.user.id)
-        contribution.hidden -= 1
-        contribution.save()
+        Contribution.objects.filter(id=contribution.id).update(hidden=F('hidden') - 1)
+        touch_items([contribution.id])
 
         try:
             comment = Comment.objects.get(id=contribution.id)
@@ -1229,13 +1171,37 @@ class UnHideIdViewSet(viewsets.ModelViewSet):
         return Response(response, status=status.HTTP_204_NO_CONTENT)
 
 
+class BatchViewSet(viewsets.ModelViewSet):
+    queryset = Contribution.objects.all()
+    serializer_class = ContributionSerializer
+    authentication_classes = [KeyAuthentication]
+    permission_classes = [KeyPermission]
+
+    @action(detail=False, methods=['post'], renderer_classes=[renderers.StaticHTMLRenderer])
+    def batch(self, request, *args, **kwargs):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+
+        if not isinstance(operations, list) or len(operations) > MAX_BATCH_SIZE:
+            raise InvalidBatchOperationException
+
+        results = run_batch(request.auth.user, operations)
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
 class CommentViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
+        user_field = request.auth
+        etag = get_list_etag(request)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
         username_filter = self.request.query_params.get('username', '')
         exclude_user_filter = self.request.query_params.get('exclude_user', '')
         order_by_filter = self.request.query_params.get('orderBy', '')
@@ -1255,240 +1221,277 @@ class CommentViewSet(viewsets.ReadOnlyModelViewSet):
                 User.objects.get(username=exclude_user_filter)
             except User.DoesNotExist:
                 raise NotFoundException
-            user_comments = selected_comments.filter(user__username=exclude_user_filter)
-            selected_comments = selected_comments.difference(user_comments)
-
-        if order_by_filter:
-            if order_by_filter == 'publication_time_asc':
-                selected_comments = selected_comments.order_by('publication_time')
-            elif order_by_filter == 'publication_time_desc':
-                selected_comments = selected_comments.order_by('-publication_time')
-            elif order_by_filter == 'votes_asc':
-                selected_comments = selected_comments.order_by('points')
-            else:
-                selected_comments = selected_comments.order_by('-points')
+            selected_comments = selected_comments.exclude(user__username=exclude_user_filter)
 
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
+        fields = get_fields(request, COMMENT_FIELDS)
+        selected_comments = apply_viewer_filters(selected_comments, user_field, liked_filter, hidden_filter)
+        selected_comments = select_fields(selected_comments, fields, COMMENT_FIELDS)
+        order_field, descending = get_order_field(order_by_filter, COMMENT_ORDER_FIELDS)
 
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        if is_streaming(request):
+            response = get_stream_response(request, selected_comments, order_field, descending,
+                                           lambda rows: get_comment_attributes_maps(rows, user_field, fields))
+            response['ETag'] = etag
+            return response
 
-        comment_list = []
+        selected_comments, headers = get_api_rows(request, selected_comments, order_field, descending)
+        comment_list = get_comment_attributes_maps(selected_comments, user_field, fields)
 
-        for comment in selected_comments:
-            comment_map = get_basic_attributes_map(comment, user_field)
-            comment_map["contribution"] = comment.contribution.id
-            comment_map["contribution_title"] = comment.contribution.title
-
-            if comment.parent is not None:
-                comment_map["parent"] = comment.parent.id
-
-            adding = True
-
-            if liked_filter or hidden_filter:
-                adding = False
-
-                if liked_filter and hidden_filter:
-                    liked_result = liked_filter == 'true'
-                    hidden_result = hidden_filter == 'true'
-
-                    if liked_result and hidden_result and comment_map['liked'] \
-                            and not comment_map['show']:
-                        adding = True
-                    elif not liked_result and hidden_result and not comment_map['liked'] \
-                            and not comment_map['show']:
-                        adding = True
-                    elif liked_result and not hidden_result and comment_map['liked'] \
-                            and comment_map['show']:
-                        adding = True
-                    elif not liked_result and not hidden_result and not comment_map['liked'] \
-                            and comment_map['show']:
-                        adding = True
-                else:
-                    if liked_filter and ((liked_filter == 'true' and comment_map['liked'])
-                                         or (liked_filter == 'false' and not comment_map['liked'])):
-                        adding = True
-                    elif (hidden_filter == 'true' and not comment_map['show']) \
-                            or (hidden_filter == 'false' and comment_map['show']):
-                        adding = True
-
-            if adding:
-                comment_list.append(comment_map)
-
-        return Response(comment_list)
+        return Response(comment_list, headers=dict(headers, ETag=etag))
 
 
 class CommentIdViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
+        user_field = request.auth
+        etag = get_item_etag(request, kwargs.get('commentId'))
+        if etag is not None and is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        fields = get_fields(request, COMMENT_FIELDS)
+
         try:
-            comment = Comment.objects.get(id=kwargs.get('commentId'))
+            comment = select_fields(Comment.objects.all(), fields, COMMENT_FIELDS).get(id=kwargs.get('commentId'))
         except Comment.DoesNotExist:
             raise NotFoundException
 
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
+        merge_pending_points([comment])
 
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        return Response(get_comment_attributes_map(comment, user_field, fields), headers={'ETag': etag})
 
-        comment_map = get_basic_attributes_map(comment, user_field)
-        comment_map["contribution"] = comment.contribution.id
-        comment_map["contribution_title"] = comment.contribution.title
 
-        if comment.parent is not None:
-            comment_map["parent"] = comment.parent.id
+def get_viewer_ids(contribution_ids, user_id):
+    # Likes and hides come back in a single query, tagged by the table they were read from
+    likes = Contribution.user_likes.through.objects.filter(user_id=user_id, contribution_id__in=contribution_ids) \
+        .values_list('contribution_id', Value(True, output_field=BooleanField()))
+    hides = Contribution.user_id_hidden.through.objects.filter(user_id=user_id, contribution_id__in=contribution_ids) \
+        .values_list('contribution_id', Value(False, output_field=BooleanField()))
+    liked_ids = set()
+    hidden_ids = set()
 
-        return Response(comment_map)
+    for contribution_id, liked in likes.union(hides, all=True):
+        (liked_ids if liked else hidden_ids).add(contribution_id)
 
+    return liked_ids, hidden_ids
 
-def is_liked_by_user(contribution, user_id):
-    try:
-        contribution.user_likes.get(id=user_id)
-        return True
-    except User.DoesNotExist:
-        return False
 
+def set_viewer_state(items, user_id):
+    if not items or hasattr(items[0], 'viewer_liked'):
+        return
 
-def is_shown_by_user(contribution, user_id):
-    try:
-        contribution.user_id_hidden.get(id=user_id)
-        return False
-    except User.DoesNotExist:
-        return True
-
-
-def get_basic_attributes_map(contribution, user_fields):
-    dataMap = {
-        'id': contribution.id,
-        'title': contribution.title,
-        'points': contribution.points,
-        'publication_time': contribution.publication_time,
-        'url': contribution.url,
-        'text': contribution.text,
-        'comments': contribution.comments,
-        'user_id': contribution.user.username,
-        'hidden': contribution.hidden,
-        'liked': is_liked_by_user(contribution, user_fields.user.id),
-        'show': is_shown_by_user(contribution, user_fields.user.id)
-    }
+    liked_ids, hidden_ids = get_viewer_ids([item.id for item in items], user_id)
 
-    return dataMap
+    for item in items:
+        item.viewer_liked = item.id in liked_ids
+        item.viewer_hidden = item.id in hidden_ids
 
 
-def apply_filters(comments_list, username_filter, order_by_filter):
-    if username_filter:
-        try:
-            user = User.objects.get(username=username_filter)
-        except User.DoesNotExist:
-            raise NotFoundException
-        comments_list = comments_list.filter(user_id=user.id)
-
-    if order_by_filter:
-        if order_by_filter == 'publication_time_asc':
-            comments_list = comments_list.order_by('publication_time')
-        elif order_by_filter == 'publication_time_desc':
-            comments_list = comments_list.order_by('-publication_time')
-        elif order_by_filter == 'votes_asc':
-            comments_list = comments_list.order_by('points')
-        else:
-            comments_list = comments_list.order_by('-points')
+# Each attribute names the joins or viewer state it needs, so only what the requested fields read gets loaded
+CONTRIBUTION_FIELDS = {
+    'id': (lambda contribution, user_fields: contribution.id, ()),
+    'title': (lambda contribution, user_fields: contribution.title, ()),
+    'points': (lambda contribution, user_fields: contribution.points, ()),
+    'publication_time': (lambda contribution, user_fields: contribution.publication_time, ()),
+    'url': (lambda contribution, user_fields: contribution.url, ()),
+    'text': (lambda contribution, user_fields: contribution.text, ()),
+    'comments': (lambda contribution, user_fields: contribution.comments, ()),
+    'user_id': (lambda contribution, user_fields: contribution.user.username, ('user',)),
+    'hidden': (lambda contribution, user_fields: contribution.hidden, ()),
+    'liked': (lambda contribution, user_fields: contribution.viewer_liked, ('viewer',)),
+    'show': (lambda contribution, user_fields: not contribution.viewer_hidden, ('viewer',)),
+}
+
+COMMENT_FIELDS = dict(CONTRIBUTION_FIELDS, **{
+    'contribution': (lambda comment, user_fields: comment.contribution_id, ()),
+    'contribution_title': (lambda comment, user_fields: comment.contribution.title, ('contribution',)),
+    'parent': (lambda comment, user_fields: comment.parent_id, ()),
+})
+
+SEARCH_FIELDS = dict(CONTRIBUTION_FIELDS, **{
+    'contribution': (lambda contribution, user_fields: contribution.story_id, ()),
+})
+
+PROFILE_FIELDS = {
+    'username': (lambda user, user_fields: user.username, ()),
+    'date_joined': (lambda user, user_fields: user.date_joined, ()),
+    'karma': (lambda user, user_fields: get_karma(user), ()),
+    'about': (lambda user, user_fields: user_fields.about, ()),
+}
+
+OWN_PROFILE_FIELDS = dict(PROFILE_FIELDS, **{
+    'email': (lambda user, user_fields: user.email, ()),
+    'showdead': (lambda user, user_fields: user_fields.showdead, ()),
+    'noprocrast': (lambda user, user_fields: user_fields.noprocrast, ()),
+    'maxvisit': (lambda user, user_fields: user_fields.maxvisit, ()),
+    'minaway': (lambda user, user_fields: user_fields.minaway, ()),
+    'delay': (lambda user, user_fields: user_fields.delay, ()),
+})
+
+
+def get_fields(request, available_fields):
+    fields = request.query_params.get('fields', '')
+
+    if not fields:
+        return None
+
+    fields = fields.split(',')
+    if any(field not in available_fields for field in fields):
+        raise InvalidFieldsParameterException
+
+    return fields
+
+
+def select_fields(queryset, fields, available_fields):
+    requirements = {requirement for field in (fields or available_fields) for requirement in available_fields[field][1]}
+
+    if 'user' in requirements:
+        queryset = queryset.select_related('user')
+
+    if 'contribution' in requirements:
+        queryset = queryset.select_related('contribution')
+
+    return queryset
 
 
-def get_comment_map(comment, user_fields, username_filter, order_by_filter):
-    comment_map = get_basic_attributes_map(comment, user_fields)
-    comment_map["contribution_title"] = comment.contribution.title
+def get_attributes_maps(items, user_fields, fields, available_fields):
+    fields = fields or list(available_fields)
+    getters = [available_fields[field][0] for field in fields]
 
-    child_comment_list = []
+    if any('viewer' in available_fields[field][1] for field in fields):
+        set_viewer_state(items, user_fields.user_id)
 
-    actual_comments = comment.comment_set.all()
-    apply_filters(actual_comments, username_filter, order_by_filter)
+    return [dict(zip(fields, [getter(item, user_fields) for getter in getters])) for item in items]
 
-    for child_comment in actual_comments:
-        child_comment_list.append(get_comment_map(child_comment, user_fields, username_filter, order_by_filter))
 
-    comment_map["comments_list"] = child_comment_list
+def get_attributes_map(item, user_fields, fields, available_fields):
+    return get_attributes_maps([item], user_fields, fields, available_fields)[0]
+
+
+def get_basic_attributes_map(contribution, user_fields, fields=None):
+    return get_attributes_map(contribution, user_fields, fields, CONTRIBUTION_FIELDS)
+
+
+def get_comment_attributes_maps(comments, user_fields, fields=None):
+    comment_maps = get_attributes_maps(comments, user_fields, fields, COMMENT_FIELDS)
+
+    for comment_map in comment_maps:
+        if comment_map.get('parent', 0) is None:
+            del comment_map['parent']
+
+    return comment_maps
+
+
+def get_comment_attributes_map(comment, user_fields, fields=None):
+    return get_comment_attributes_maps([comment], user_fields, fields)[0]
+
+
+def get_comment_map(comment, user_fields, contribution_title, fields=None):
+    comment_map = get_basic_attributes_map(comment, user_fields, fields)
+    comment_map["contribution_title"] = contribution_title
+    comment_map["comments_list"] = [get_comment_map(child_comment, user_fields, contribution_title, fields)
+                                    for child_comment in comment.replies]
     return comment_map
 
 
+class SearchViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Contribution.objects.all()
+    authentication_classes = [KeyAuthentication]
+    permission_classes = [KeyPermission]
+
+    @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
+    def get_actual(self, request, *args, **kwargs):
+        user_field = request.auth
+        query = request.query_params.get('q', '')
+
+        if not get_search_terms(query):
+            raise InvalidSearchQueryException
+
+        etag = get_list_etag(request)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        fields = get_fields(request, SEARCH_FIELDS)
+        results = select_fields(Contribution.objects.all(), fields, SEARCH_FIELDS)
+
+        try:
+            limit = get_limit(request.query_params.get('limit', ''))
+            results, next_cursor = search_contributions(results, query, request.query_params.get('cursor', ''), limit)
+        except ValueError:
+            raise InvalidPaginationParametersException
+
+        result_list = get_attributes_maps(merge_pending_points(results), user_field, fields, SEARCH_FIELDS)
+        return Response(result_list, headers=dict(get_next_link_headers(request, next_cursor), ETag=etag))
+
+
 class ContributionCommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
+        user_field = request.auth
+        etag = get_item_etag(request, kwargs.get('id'))
+        if etag is not None and is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
 
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        fields = get_fields(request, CONTRIBUTION_FIELDS)
 
         try:
-            Contribution.objects.get(id=kwargs.get('id'))
-        except Contribution.DoesNotExist:
-            raise NotFoundException
+            contribution = select_fields(Comment.objects.select_related('contribution'), fields, CONTRIBUTION_FIELDS) \
+                .get(id=kwargs.get('id'))
+            contribution_title = contribution.contribution.title
+        except Comment.DoesNotExist:
+            try:
+                contribution = select_fields(Contribution.objects.all(), fields, CONTRIBUTION_FIELDS) \
+                    .get(id=kwargs.get('id'))
+                contribution_title = contribution.title
+            except Contribution.DoesNotExist:
+                raise NotFoundException
 
-        contribution = Contribution.objects.get(id=kwargs.get('id'))
-        contribution_map = get_basic_attributes_map(contribution, user_field)
-        contribution_first_comments = Comment.objects.filter(contribution_id=kwargs.get('id'),
-                                                             parent__isnull=True)
+        merge_pending_points([contribution])
+        contribution_map = get_basic_attributes_map(contribution, user_field, fields)
 
         username_filter = self.request.query_params.get('username', '')
         order_by_filter = self.request.query_params.get('orderBy', '')
-        apply_filters(contribution_first_comments, username_filter, order_by_filter)
+        order_field, descending = get_order_field(order_by_filter, COMMENT_ORDER_FIELDS)
+        sign = '-' if descending else ''
+
+        if username_filter and not User.objects.filter(username=username_filter).exists():
+            raise NotFoundException
+
+        # Without liked/show in the response the tree skips loading the viewer's likes and hides
+        viewer_id = user_field.user.id if not fields or {'liked', 'show'} & set(fields) else None
+        comment_tree = build_comment_tree(contribution, viewer_id, (sign + order_field, sign + 'id'), username_filter)
 
         comment_list = []
-        for comment in contribution_first_comments:
-            comment_list.append(get_comment_map(comment, user_field, username_filter, order_by_filter))
+        for comment in comment_tree:
+            comment_list.append(get_comment_map(comment, user_field, contribution_title, fields))
 
         contribution_map["comments_list"] = comment_list
 
         # return Response(CommentSerializer(contribution_comments, many=True).data)
-        return Response(contribution_map)
+        return Response(contribution_map, headers={'ETag': etag})
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def create_comment(self, request, *args, **kwargs):
         text = self.request.data.get('text', '')
         parent_id = kwargs.get('id', '')
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_field = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_field = request.auth
 
         try:
             comment = Comment.objects.get(id=parent_id)
             contribution = comment.contribution
-            contribution.comments += 1
-            contribution.save()
-            comment.comments += 1
-            comment.save()
-
-            parent = comment.parent
-            while parent is not None:
-                parent.comments += 1
-                parent.save()
-                parent = parent.parent
         except Comment.DoesNotExist:
             try:
                 comment = None
                 contribution = Contribution.objects.get(id=parent_id)
-                contribution.comments += 1
-                contribution.save()
             except Contribution.DoesNotExist:
                 raise NotFoundException
 
@@ -1496,6 +1499,11 @@ class ContributionCommentViewSet(viewsets.ModelViewSet):
                 or (comment is not None and comment.user.id == user_field.user.id):
             raise ContributionUserException
 
+        if comment is None:
+            increment_story_comments_number(contribution)
+        else:
+            increment_comments_number(comment)
+
         comment = Comment(user=user_field.user, title='', points=1, publication_time=datetime.today(),
                           comments=0, liked=True, show=True, url=None, text=text, contribution=contribution,
                           parent=comment)
@@ -1516,6 +1524,7 @@ class ContributionCommentViewSet(viewsets.ModelViewSet):
 class ProfilesViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UserFields.objects.all()
     serializer_class = CommentSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, methods=['put'], renderer_classes=[renderers.StaticHTMLRenderer])
@@ -1528,13 +1537,7 @@ class ProfilesViewSet(viewsets.ReadOnlyModelViewSet):
         minaway = self.request.query_params.get('minaway', '')
         delay = self.request.query_params.get('delay', '')
 
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
-        try:
-            user_fields = UserFields.objects.get(api_key=api_key)
-        except UserFields.DoesNotExist:
-            raise UnauthenticatedException
+        user_fields = request.auth
 
         if about:
             user_fields.about = about
@@ -1565,25 +1568,18 @@ class ProfilesViewSet(viewsets.ReadOnlyModelViewSet):
 class ProfilesIdViewSet(viewsets.ModelViewSet):
     queryset = UserFields.objects.all()
     serializer_class = CommentSerializer
+    authentication_classes = [KeyAuthentication]
     permission_classes = [KeyPermission]
 
     @action(detail=True, renderer_classes=[renderers.StaticHTMLRenderer])
     def get_actual(self, request, *args, **kwargs):
-        key = self.request.META.get('HTTP_API_KEY', '')
-        api_key = APIKeyManager.get_hash_key(key)
-
         try:
             user = User.objects.get(username=kwargs.get('username'))
         except User.DoesNotExist:
             raise NotFoundException
 
         user_fields = UserFields.objects.get(user_id=user.id)
+        available_fields = OWN_PROFILE_FIELDS if user_fields.id == request.auth.id else PROFILE_FIELDS
+        fields = get_fields(request, available_fields)
 
-        if str(user_fields.api_key) != str(api_key):
-            data = {'username': user.username,
-                    'date_joined': user.date_joined,
-                    'karma': user_fields.karma,
-                    'about': user_fields.about}
-            return Response(data)
-
-        return Response(UserFieldsSerializer(user_fields).data)
+        return Response(get_attributes_map(user, user_fields, fields, available_fields))
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Case, When, Value, IntegerField, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from empo_news.models import Contribution, UserFields, VoteEvent, PendingVote, VoteRollupCheckpoint
+from empo_news.ranking import get_rank_divisor, get_rank_scores
+from empo_news.versions import touch_contributions, touch_roots
+
+Like = Contribution.user_likes.through
+
+
+def create_user_fields(user_id, karma):
+    return UserFields(user_id=user_id, karma=karma, about="", showdead=0, noprocrast=0, maxvisit=20, minaway=180,
+                      delay=0)
+
+
+def apply_vote(contribution, user, delta):
+    VoteEvent.objects.create(user_id=user.id, contribution_id=contribution.id, value=delta)
+
+    if getattr(settings, 'VOTE_WRITE_BEHIND', False):
+        PendingVote.objects.create(contribution_id=contribution.id, author_id=contribution.user_id, value=delta)
+        contribution.points += delta
+        return
+
+    # One statement moves the points, the score computed from the points it writes and the version, so the hottest row
+    # is written once per vote
+    Contribution.objects.filter(id=contribution.id).update(
+        points=F('points') + delta, version=F('version') + 1,
+        rank_score=Cast(F('points') + delta - 1, FloatField())
+        / Value(get_rank_divisor(contribution.publication_time), output_field=FloatField()))
+    contribution.points += delta
+    contribution.update_rank_score()
+
+    if not UserFields.objects.filter(user_id=contribution.user_id).update(karma=F('karma') + delta):
+        create_user_fields(contribution.user_id, 1 + delta).save()
+
+    touch_roots([contribution.id])
+
+
+def add_vote(contribution, user):
+    with transaction.atomic():
+        created = Like.objects.get_or_create(contribution_id=contribution.id, user_id=user.id)[1]
+        if created:
+            apply_vote(contribution, user, 1)
+    return created
+
+
+def remove_vote(contribution, user):
+    with transaction.atomic():
+        deleted = Like.objects.filter(contribution_id=contribution.id, user_id=user.id).delete()[0] > 0
+        if deleted:
+            apply_vote(contribution, user, -1)
+    return deleted
+
+
+def toggle_vote(contribution, user):
+    if remove_vote(contribution, user):
+        return False
+
+    add_vote(contribution, user)
+    return True
+
+
+FLUSH_BATCH_SIZE = 500
+RANK_BATCH_SIZE = 2000
+
+
+def get_deltas(pending, field):
+    return dict(pending.values_list(field).annotate(total=Sum('value')).exclude(total=0))
+
+
+def get_delta_expression(field, key, deltas):
+    return F(field) + Case(*[When(**{key: target_id, 'then': Value(delta)}) for target_id, delta in deltas.items()],
+                           default=Value(0), output_field=IntegerField())
+
+
+def refresh_rank_scores(contributions, batch_size=RANK_BATCH_SIZE):
+    now = timezone.now()
+    last_id = 0
+    updated = 0
+
+    while True:
+        rows = list(contributions.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'points', 'publication_time')[:batch_size])
+        if not rows:
+            return updated
+
+        ids, points, publication_times = zip(*rows)
+        ages_hours = [(now - publication_time).total_seconds() / 3600 for publication_time in publication_times]
+        scores = get_rank_scores(points, ages_hours)
+        Contribution.objects.bulk_update([Contribution(id=contribution_id, rank_score=float(score))
+                                          for contribution_id, score in zip(ids, scores)], ['rank_score'])
+
+        last_id = ids[-1]
+        updated += len(rows)
+
+
+def apply_pending_votes(rows):
+    points = {}
+    karma = {}
+
+    for _, contribution_id, author_id, value in rows:
+        points[contribution_id] = points.get(contribution_id, 0) + value
+        karma[author_id] = karma.get(author_id, 0) + value
+
+    points = {contribution_id: delta for contribution_id, delta in points.items() if delta}
+    karma = {user_id: delta for user_id, delta in karma.items() if delta}
+
+    if points:
+        Contribution.objects.filter(id__in=points).update(points=get_delta_expression('points', 'id', points))
+        refresh_rank_scores(Contribution.objects.filter(id__in=points))
+        touch_contributions(list(points))
+
+    if karma:
+        UserFields.objects.filter(user_id__in=karma).update(karma=get_delta_expression('karma', 'user_id', karma))
+        missing = set(karma) - set(UserFields.objects.filter(user_id__in=karma).values_list('user_id', flat=True))
+        UserFields.objects.bulk_create([create_user_fields(user_id, 1 + karma[user_id]) for user_id in missing])
+
+
+def flush_pending_votes():
+    flushed = 0
+
+    while True:
+        with transaction.atomic():
+            # Shares the rollup lock so a rollup never sees a half-applied flush
+            VoteRollupCheckpoint.objects.select_for_update().get_or_create(id=1)
+            rows = list(PendingVote.objects.order_by('id')
+                        .values_list('id', 'contribution_id', 'author_id', 'value')[:FLUSH_BATCH_SIZE])
+
+            if not rows:
+                return flushed
+
+            apply_pending_votes(rows)
+            PendingVote.objects.filter(id__in=[row[0] for row in rows]).delete()
+            flushed += len(rows)
+
+
+def apply_vote_batch(user, authors, added_ids, removed_ids):
+    if added_ids:
+        Like.objects.bulk_create([Like(contribution_id=contribution_id, user_id=user.id)
+                                  for contribution_id in added_ids])
+
+    if removed_ids:
+        deleted = Like.objects.filter(user_id=user.id, contribution_id__in=removed_ids).delete()[0]
+        if deleted != len(removed_ids):
+            raise IntegrityError('Votes changed while the batch was being applied')
+
+    rows = [(None, contribution_id, authors[contribution_id], 1) for contribution_id in added_ids] + \
+           [(None, contribution_id, authors[contribution_id], -1) for contribution_id in removed_ids]
+
+    if not rows:
+        return
+
+    VoteEvent.objects.bulk_create([VoteEvent(user_id=user.id, contribution_id=contribution_id, value=value)
+                                   for _, contribution_id, _, value in rows])
+
+    if getattr(settings, 'VOTE_WRITE_BEHIND', False):
+        PendingVote.objects.bulk_create([PendingVote(contribution_id=contribution_id, author_id=author_id, value=value)
+                                         for _, contribution_id, author_id, value in rows])
+    else:
+        apply_pending_votes(rows)
+
+
+def merge_pending_points(contributions):
+    if not getattr(settings, 'VOTE_WRITE_BEHIND', False) or not contributions:
+        return contributions
+
+    deltas = get_deltas(PendingVote.objects.filter(contribution_id__in=[c.id for c in contributions]),
+                        'contribution_id')
+    for contribution in contributions:
+        contribution.points += deltas.get(contribution.id, 0)
+
+    return contributions
+
+
+def get_karma(user):
+    karma = getattr(UserFields.objects.filter(user=user).first(), 'karma', 1)
+
+    if getattr(settings, 'VOTE_WRITE_BEHIND', False):
+        karma += PendingVote.objects.filter(author_id=user.id).aggregate(total=Sum('value'))['total'] or 0
+
+    return karma